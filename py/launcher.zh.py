@@ -2,22 +2,39 @@
 import sys
 import os
 import json
-import shutil
-import subprocess
-import psutil
+import time
+import threading
 from pathlib import Path
-from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QStackedWidget, QFormLayout, QComboBox, QPlainTextEdit,
-    QLineEdit, QCheckBox, QTabWidget, QLabel
-)
-from PySide6.QtCore import QObject, QThread, Signal, Qt, Slot
+from launcher_core.startup import elapsed_since_start_ms, startup_budget_ms, eager_imports
+from launcher_core.channel import Channel
+from launcher_core.settings import number_setting
+# 仅在运行时才需要的模块在使用处导入，以加快启动
 
 RUN_PATH = Path.cwd()
 SRC_PATH = Path(__file__).resolve()
 SCRIPTS_PATH = RUN_PATH / "python_standalone" / "Scripts"
 PYTHON_EXE = sys.executable
 CONFIG_FILE = os.path.join(RUN_PATH, "launcher_config.json")
+LOGS_PATH = RUN_PATH / "logs"
+CACHE_PATH = RUN_PATH / "launcher_cache"
+BUILD_CACHE_FILE = CACHE_PATH / "build_cache.json"
+READY_TIMES_FILE = CACHE_PATH / "ready_times.jsonl"
+DIST_SNAPSHOT_FILE = CACHE_PATH / "installed_packages.json"
+WHEELHOUSE_PATH = RUN_PATH / "wheelhouse"
+COMPILER_CACHE_PATH = RUN_PATH / "compiler_cache"
+MODEL_STORE_PATH = RUN_PATH / "model_store"
+SCROLLBACK_PATH = CACHE_PATH / "scrollback"
+MODEL_VERIFY_FILE = CACHE_PATH / "verified_model_files.json"
+HUB_USAGE_FILE = CACHE_PATH / "hub_cache_usage.json"
+RESULT_CACHE_PATH = CACHE_PATH / "results"
+# 空闲策略检查距上次请求时间的间隔
+IDLE_CHECK_SECONDS = 5
+
+# 同时启动的多个运行不能同时重装软件包
+SETUP_LOCK = threading.Lock()
+
+# 程序已验证可用的版本；每次启动时在进程内检查
+HF_HUB_REQUIREMENT = "huggingface-hub[cli,hf-xet]==0.36.0"
 
 
 # --- 1. 程序与参数定义 ---
@@ -30,6 +47,17 @@ PROGRAMS = [
             {"name": "HTTPS_PROXY", "type": "string", "label": "HTTPS 代理服务器", "help": "设置 HTTPS_PROXY 环境变量，例: http://localhost:1080", "default": ""},
             {"name": "PIP_INDEX_URL", "type": "string", "label": "PyPI 镜像", "help": "安装 Python 包的 PyPI 镜像源", "default": "https://mirrors.cernet.edu.cn/pypi/web/simple"},
             {"name": "HF_ENDPOINT", "type": "string", "label": "HuggingFace 镜像", "help": "HuggingFace Hub 下载使用的镜像源", "default": "https://hf-mirror.com"},
+            {"name": "_output_max_lines", "type": "string", "label": "输出窗口行数上限", "help": "输出窗口中保留的行数；更早的行会移入回滚文件，仍可通过“历史”按钮查看。0 表示不限制", "default": "5000"},
+            {"name": "_log_max_mb", "type": "string", "label": "运行日志分段大小 (MB)", "help": "每次运行的输出都会保存到 logs 目录；日志分段达到此大小后轮转", "default": "10"},
+            {"name": "_log_backups", "type": "string", "label": "每次运行保留的分段数", "help": "每个运行日志保留的已轮转分段数量", "default": "5"},
+            {"name": "_log_compress", "type": "boolean", "label": "压缩已轮转分段", "help": "使用 gzip 压缩已轮转的运行日志分段以节省磁盘空间", "default": False},
+            {"name": "_log_keep_runs", "type": "string", "label": "保留的运行日志数", "help": "启动新的运行时删除更早的运行日志。0 表示全部保留", "default": "20"},
+            {"name": "_ready_http_path", "type": "string", "label": "就绪检查路径", "help": "启动后启动器会轮询程序的 --host/--port，直到其接受连接。若填写 HTTP 路径（如 /），则改为等待该路径返回成功响应。在网关之后还会轮询该路径，把卡住的服务进程移出轮转，仅检查连接无法发现这种情况", "default": ""},
+            {"name": "_ready_timeout", "type": "string", "label": "就绪超时 (秒)", "help": "等待程序就绪的最长时间；就绪耗时记录在 launcher_cache/ready_times.jsonl 中", "default": "1800"},
+            {"name": "_telemetry_interval", "type": "string", "label": "资源采样间隔 (秒)", "help": "按此间隔采样运行中程序及其子进程的 CPU、内存、线程与 I/O 使用情况，并显示在输出旁。0 表示不采样", "default": "1"},
+            {"name": "_compiler_cache", "type": "boolean", "label": "使用编译器缓存", "help": "在 PATH 中找到 sccache 或 ccache 时，通过它编译纹理扩展，只重新编译有变化的源文件。缓存保存在 compiler_cache 文件夹中", "default": True},
+            {"name": "_auto_offline", "type": "boolean", "label": "自动离线模式", "help": "所选程序配置加载的模型在本地缓存中均完整时，以 HF_HUB_OFFLINE=1 和 TRANSFORMERS_OFFLINE=1 启动程序，不再访问 HuggingFace Hub。模型缺失或所需文件无法确定时仍以在线模式启动", "default": True},
+            {"name": "_hub_cache_budget_gb", "type": "string", "label": "模型缓存容量上限 (GB)", "help": "每次启动前，按最久未使用的顺序删除 HuggingFace hub 缓存中的模型版本，直到总大小不超过此值。所选程序或其他运行中程序使用的模型不会被删除。0 表示不限制", "default": "0"},
         ],
     },
     {
@@ -37,6 +65,10 @@ PROGRAMS = [
         "label": "混元 3D 2.0 | 功能全面",
         "folder": "Hunyuan3D-2",
         "script": "gradio_app.py",
+        "flag_parameters": ["_model_select"],
+        "texture_flags": {False: "--disable_tex"},
+        "models": [{"choice": "_model_select", "options": {"--mini": ["tencent/Hunyuan3D-2mini", "hunyuan3d-dit-v2-mini"], "--h2": ["tencent/Hunyuan3D-2", "hunyuan3d-dit-v2-0"], "--mv": ["tencent/Hunyuan3D-2mv", "hunyuan3d-dit-v2-mv"]}, "suffixes": {"--turbo": "-turbo"}},
+                   {"repo_id": "tencent/Hunyuan3D-2", "texture": True}],
         "parameters": [
             {"name": "_enable_texture_gen", "type": "boolean", "label": "启用纹理生成功能", "help": "需要安装CUDA与MSVC。默认设置下，生成网格需4G显存，生成纹理需6G显存"},
             {"name": "_model_select", "type": "choice", "label": "模型选择", "options": [
@@ -62,6 +94,8 @@ PROGRAMS = [
         "label": "混元 3D 2.0 官方代码 | 适合显存充裕的用户",
         "folder": "Hunyuan3D-2-vanilla",
         "script": "gradio_app.py",
+        "texture_flags": {False: "--disable_tex"},
+        "models": [{"repo": "--model_path", "subfolder": "--subfolder"}, {"repo": "--texgen_model_path", "texture": True}],
         "parameters": [
             {"name": "_enable_texture_gen", "type": "boolean", "label": "启用纹理生成功能", "help": "需要安装CUDA与MSVC。默认设置下，可能需要16G以上显存"},
             {"name": "--low_vram_mode", "type": "boolean", "label": "低显存模式", "default": True},
@@ -84,6 +118,9 @@ PROGRAMS = [
         "label": "混元 3D 2.1 | 质量更佳，运行更慢，无 MV",
         "folder": "Hunyuan3D-2.1",
         "script": "gradio_app.py",
+        "texture_flags": {False: "--disable_tex"},
+        "models": [{"repo_id": "tencent/Hunyuan3D-2.1", "subfolder_name": "hunyuan3d-dit-v2-1"},
+                   {"repo_id": "tencent/Hunyuan3D-2.1", "subfolder_name": "hunyuan3d-paintpbr-v2-1", "texture": True}],
         "parameters": [
             {"name": "_enable_texture_gen", "type": "boolean", "label": "启用纹理生成功能", "help": "需要安装CUDA与MSVC。默认最大优化设置下，生成网格需3G显存，生成纹理需10G显存"},
             {"name": "--low_vram_mode", "type": "boolean", "label": "低显存模式", "help": "默认启用，与 mmgp 优化不冲突，关闭后显存占用明显上升", "default": True},
@@ -102,12 +139,20 @@ PROGRAMS = [
         "label": "API 2.0 | 用于 Blender Addon 等",
         "folder": "Hunyuan3D-2",
         "script": "api_server.py",
+        "gateway": True,
+        "texture_flags": {True: "--enable_tex"},
+        "models": [{"repo": "--model_path"}, {"repo": "--texgen_model_path", "texture": True}],
         "parameters": [
             {"name": "_enable_texture_gen", "type": "boolean", "label": "启用纹理生成功能", "help": "API 模式运行较快，但可能显存占用较多"},
             {"name": "--model_path", "type": "string", "label": "使用模型", "default": "tencent/Hunyuan3D-2mini"},
             {"name": "--texgen_model_path", "type": "string", "label": "纹理功能使用模型", "default": "tencent/Hunyuan3D-2"},
             {"name": "--host", "type": "string", "label": "HTTP 服务监听地址", "default": "0.0.0.0"},
             {"name": "--port", "type": "string", "label": "HTTP 服务监听端口", "default": "8081"},
+            {"name": "_queue_limit", "type": "string", "label": "并发请求数（0 = 不排队）", "help": "大于 0 时，由启动器监听该端口并将请求排队，每次最多把此数量的请求交给每个改用内部端口的服务进程。带有 X-Priority: batch 请求头的请求排在交互请求之后。队列指标可通过 /launcher/metrics 查看", "default": "0"},
+            {"name": "_replicas", "type": "string", "label": "服务进程数", "help": "在该端口之后的连续内部端口上启动的服务进程数量。每个新请求交给正在处理请求最少的进程；崩溃的进程会被重启，在恢复响应前不再分配请求。未崩溃但卡住的进程只有在设置了就绪检查路径时才能被发现，否则接受连接即视为响应。每个进程都会加载一份模型，内存占用随数量增加", "default": "1"},
+            {"name": "_result_cache_mb", "type": "string", "label": "结果缓存大小（MB，0 = 关闭）", "help": "大于 0 时，/generate 的结果按请求（包括图片、种子、步数与纹理开关）及模型设置的哈希保存在磁盘上。重复的请求直接从磁盘返回而不再重新生成，同时到达的相同请求只会发给服务一次。超出此大小时删除最久未使用的结果", "default": "0"},
+            {"name": "_idle_minutes", "type": "string", "label": "空闲时停止（分钟，0 = 从不）", "help": "大于 0 时，服务进程在这么多分钟没有请求后停止，以释放内存与显存。启动器继续监听该端口，收到下一个请求时重新启动服务进程，该请求会等待到服务就绪", "default": "0"},
+            {"name": "_blue_green", "type": "boolean", "label": "零停机重启", "help": "运行中修改选项时，新配置在运行中服务旁的内部端口上启动，期间原服务继续响应。新配置就绪后端口切换到它，旧服务在进行中的请求完成、已开始任务的结果被取回后停止，等待任务最多 10 分钟。切换期间两者都会占用模型内存"},
         ]
     },
     {
@@ -115,17 +160,47 @@ PROGRAMS = [
         "label": "API 2.1 | 用于 Blender Addon 等",
         "folder": "Hunyuan3D-2.1",
         "script": "api_server.py",
+        "gateway": True,
+        "models": [{"repo": "--model_path", "subfolder": "--subfolder"}],
         "parameters": [
             {"name": "--low_vram_mode", "type": "boolean", "label": "低显存模式", "default": True},
             {"name": "--model_path", "type": "string", "label": "使用模型", "default": "tencent/Hunyuan3D-2.1"},
             {"name": "--subfolder", "type": "string", "label": "模型子目录", "default": "hunyuan3d-dit-v2-1"},
             {"name": "--host", "type": "string", "label": "HTTP 服务监听地址", "default": "0.0.0.0"},
             {"name": "--port", "type": "string", "label": "HTTP 服务监听端口", "default": "8081"},
+            {"name": "_queue_limit", "type": "string", "label": "并发请求数（0 = 不排队）", "help": "大于 0 时，由启动器监听该端口并将请求排队，每次最多把此数量的请求交给每个改用内部端口的服务进程。带有 X-Priority: batch 请求头的请求排在交互请求之后。队列指标可通过 /launcher/metrics 查看", "default": "0"},
+            {"name": "_replicas", "type": "string", "label": "服务进程数", "help": "在该端口之后的连续内部端口上启动的服务进程数量。每个新请求交给正在处理请求最少的进程；崩溃的进程会被重启，在恢复响应前不再分配请求。未崩溃但卡住的进程只有在设置了就绪检查路径时才能被发现，否则接受连接即视为响应。每个进程都会加载一份模型，内存占用随数量增加", "default": "1"},
+            {"name": "_result_cache_mb", "type": "string", "label": "结果缓存大小（MB，0 = 关闭）", "help": "大于 0 时，/generate 的结果按请求（包括图片、种子、步数与纹理开关）及模型设置的哈希保存在磁盘上。重复的请求直接从磁盘返回而不再重新生成，同时到达的相同请求只会发给服务一次。超出此大小时删除最久未使用的结果", "default": "0"},
+            {"name": "_idle_minutes", "type": "string", "label": "空闲时停止（分钟，0 = 从不）", "help": "大于 0 时，服务进程在这么多分钟没有请求后停止，以释放内存与显存。启动器继续监听该端口，收到下一个请求时重新启动服务进程，该请求会等待到服务就绪", "default": "0"},
+            {"name": "_blue_green", "type": "boolean", "label": "零停机重启", "help": "运行中修改选项时，新配置在运行中服务旁的内部端口上启动，期间原服务继续响应。新配置就绪后端口切换到它，旧服务在进行中的请求完成、已开始任务的结果被取回后停止，等待任务最多 10 分钟。切换期间两者都会占用模型内存"},
         ]
     },
 ]
 
 
+# 纹理生成所需的原生扩展，按源码树（程序目录）划分
+TEXTURE_EXTENSIONS = {
+    "Hunyuan3D-2": [
+        {"name": "custom_rasterizer", "dir": os.path.join("Hunyuan3D-2", "hy3dgen", "texgen", "custom_rasterizer")},
+        {"name": "differentiable_renderer", "dir": os.path.join("Hunyuan3D-2", "hy3dgen", "texgen", "differentiable_renderer"),
+         "pyd_src": os.path.join("build", "lib.win-amd64-cpython-312", "mesh_processor.cp312-win_amd64.pyd"),
+         "pyd_dst": "mesh_processor.cp312-win_amd64.pyd"},
+    ],
+    "Hunyuan3D-2-vanilla": [
+        {"name": "custom_rasterizer", "dir": os.path.join("Hunyuan3D-2-vanilla", "hy3dgen", "texgen", "custom_rasterizer")},
+        {"name": "differentiable_renderer", "dir": os.path.join("Hunyuan3D-2-vanilla", "hy3dgen", "texgen", "differentiable_renderer"),
+         "pyd_src": os.path.join("build", "lib.win-amd64-cpython-312", "mesh_processor.cp312-win_amd64.pyd"),
+         "pyd_dst": "mesh_processor.cp312-win_amd64.pyd"},
+    ],
+    "Hunyuan3D-2.1": [
+        {"name": "custom_rasterizer", "dir": os.path.join("Hunyuan3D-2.1", "hy3dpaint", "custom_rasterizer")},
+        {"name": "DifferentiableRenderer", "dir": os.path.join("Hunyuan3D-2.1", "hy3dpaint", "DifferentiableRenderer"),
+         "pyd_src": os.path.join("build", "lib.win-amd64-cpython-312", "mesh_inpaint_processor.cp312-win_amd64.pyd"),
+         "pyd_dst": "mesh_inpaint_processor.cp312-win_amd64.pyd"},
+    ],
+}
+
+
 # --- 2. 配置管理 ---
 class ConfigManager:
     """负责读写 JSON 配置文件。"""
@@ -146,38 +221,86 @@ class ConfigManager:
         except IOError as e:
             print(f"保存配置时出错: {e}")
 
+    def load_full_config(self):
+        """加载已存配置，并用默认值补全缺失的程序或参数。"""
+        saved_config = self.load_config()
+        
+        default_config = {"last_selected_program": ""}
+        for p in PROGRAMS:
+            program_name = p['name']
+            if "common_env_vars" in p:
+                default_config[program_name] = {
+                    setting['name']: setting['default'] for setting in p['common_env_vars']
+                }
+            elif "parameters" in p:
+                default_config[program_name] = {
+                    param['name']: param.get('default') for param in p['parameters']
+                }
+                if not default_config.get("last_selected_program"):
+                    default_config["last_selected_program"] = program_name
 
-# --- 3. 后台工作线程 ---
-class ProcessWorker(QObject):
-    """在独立线程中执行子进程。"""
-    output_received = Signal(str)
-    process_finished = Signal(int)
-    status_update = Signal(str)
+        for key, value in saved_config.items():
+            if isinstance(value, dict):
+                if key not in default_config:
+                    default_config[key] = {}
+                default_config[key].update(value)
+            else:
+                default_config[key] = value
+                
+        return default_config
+
+
+# --- 3. 启动步骤 ---
+class LaunchRunner:
+    """环境准备、扩展编译与程序启动，不依赖界面库。
 
+    子类需提供 ProcessWorker 中声明的各个信号，可以是 Qt 信号，
+    也可以是 launcher_core.channel.Channel 对象。
+    """
     def __init__(self):
-        super().__init__()
         self.process = None
+        self.scheduler = None
+        self.prefetcher = None
+        self.run_log = None
+        self.sampler = None
+        self.timeline = None
+        self.output_reader = None
+        self.restart_request = None
+        self.gateway = None
+        self.backend_ports = []
+        self.replicas = []
+        self.idle_limit = 0
+        self.idle_stopped = False
+        self.wake_event = threading.Event()
+        self.woke_at = None
+        self.idle_log = []
+        self.switching = False
+        self.texture_prepared = False
+        self.can_restart = False
         self.is_running = False
 
     def run_process(self, program_data, common_env_vars):
+        """启动程序，并在时间线中记录每个启动阶段的耗时。"""
+        self._with_timeline(self._run_program, program_data, common_env_vars)
 
-        def pip_install(package):
-            if not self.is_running:
-                return -1
-            pip_cmd = [PYTHON_EXE, "-sm", "pip", "install", "--no-build-isolation", package]
-            self.process = subprocess.Popen(
-                pip_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, encoding='utf-8', errors='replace',
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0,
-                env=env
-            )
-            for line in iter(self.process.stdout.readline, ''):
-                if not self.is_running:
-                    self._kill_process_tree(self.process.pid)
-                    return -1
-                self.output_received.emit(line)
-            self.process.wait()
-            return self.process.returncode
+    def _with_timeline(self, target, *args):
+        """执行 target，无论运行如何结束都随后发出其各阶段的时间线。"""
+        from launcher_core.timeline import Timeline
+        self.timeline = Timeline()
+        try:
+            target(*args)
+        finally:
+            self.timeline.close()
+            self.timeline_recorded.emit(self.timeline)
+
+    def _run_program(self, program_data, common_env_vars):
+        import hashlib
+        import sysconfig
+        import subprocess
+        from launcher_core.buildcache import toolchain_fingerprint
+        from launcher_core.depprobe import unmet_requirement
+        from launcher_core.dedup import link_or_copy
+        from launcher_core.steps import Step, StepGraph, DONE, SKIPPED, FAILED
 
         def run_generic_command(cmd_list):
             if not self.is_running: return -1
@@ -187,186 +310,719 @@ class ProcessWorker(QObject):
                 creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0,
                 env=env
             )
-            for line in iter(self.process.stdout.readline, ''):
-                if not self.is_running:
-                    self._kill_process_tree(self.process.pid)
-                    return -1
-                self.output_received.emit(line)
-            self.process.wait()
-            return self.process.returncode
+            return self._pump_output(self.process)
+
+        def pip_install(package):
+            return run_generic_command(self._pip_command(package))
 
         self.is_running = True
         script_path = program_data['script']
         folder = program_data['folder']
         params = program_data['parameters']
         program_name = program_data['program_name']
+        self._open_run_log(program_name, common_env_vars)
 
         self.output_received.emit(f"当前运行路径: {RUN_PATH}")
         self.output_received.emit(f"脚本所在路径: {SRC_PATH}")
 
         # 步骤 1: 准备环境变量
-        env = os.environ.copy()
-        for key, value in common_env_vars.items():
-            if value:
-                env[key] = value
-                if key.upper() == "HTTP_PROXY": 
-                    env["http_proxy"] = value
-                    self.output_received.emit(f"配置 HTTP 代理服务器: {value}")
-                elif key.upper() == "HTTPS_PROXY": 
-                    env["https_proxy"] = value
-                    self.output_received.emit(f"配置 HTTPS 代理服务器: {value}")
+        with self.timeline.span("准备环境变量"):
+            env = self._prepare_env(common_env_vars)
 
-        # 按需复制 u2net.onnx 到用户目录
         user_u2net = Path.home() / ".u2net" / "u2net.onnx"
         bundled_u2net = RUN_PATH / "extras" / "u2net.onnx"
-        if not user_u2net.exists():
+        program_dir = RUN_PATH / folder
+        command = None
+        spawned_at = None
+        model_requirements = self._model_requirements(program_data)
+        missing_models = None
+
+        def copy_u2net():
             if bundled_u2net.exists():
                 self.output_received.emit("正在复制 u2net.onnx...")
                 user_u2net.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy(bundled_u2net, user_u2net)
-
-        # 重新安装 huggingface-hub（仅执行一次）
-        marker = SCRIPTS_PATH / ".hf-reinstalled"
-        if not marker.exists():
-            self.output_received.emit("正在重新安装 huggingface-hub...")
-            uninstall_cmd = [PYTHON_EXE, "-sm", "pip", "uninstall", "--yes", "huggingface-hub"]
-            run_generic_command(uninstall_cmd)
-            if self.is_running:
-                result = pip_install("huggingface-hub[cli,hf-xet]==0.36.0")
-                if result == 0 and self.is_running:
-                    marker.touch()
-        if not self.is_running:
-            self.process_finished.emit(-1)
-            return
-
-        # 步骤 2: 如果需要，执行纹理生成安装
-        enable_texture_gen = params.get("_enable_texture_gen", False)
-        if enable_texture_gen:
+                # 用户目录与启动器在同一卷上时，硬链接不耗时也不额外占用空间
+                link_or_copy(bundled_u2net, user_u2net)
+
+        def reinstall_hub():
+            from launcher_core.scheduler import site_packages_lock
+
+            # 其他运行可能正在重装
+            with SETUP_LOCK, site_packages_lock():
+                unmet = unmet_requirement(HF_HUB_REQUIREMENT)
+                if unmet:
+                    self.output_received.emit(f"{unmet[0]} {unmet[1] or '(未安装)'} 不满足 {HF_HUB_REQUIREMENT}")
+                    self.output_received.emit("正在重新安装 huggingface-hub...")
+                    if unmet[1]:
+                        uninstall_cmd = [PYTHON_EXE, "-sm", "pip", "uninstall", "--yes", "huggingface-hub"]
+                        run_generic_command(uninstall_cmd)
+                    if self.is_running:
+                        pip_install(HF_HUB_REQUIREMENT)
+            return self.is_running
+
+        def build_extensions():
             self.status_update.emit("正在为纹理生成功能执行编译安装...")
             self.output_received.emit("--- 开始纹理生成功能设置 ---\n")
-            self.output_received.emit("编译安装 DISO...")
-            result = pip_install("diso")
-            if not self.is_running: 
-                self.process_finished.emit(-1)
-                return
-            if result != 0:
-                self.output_received.emit("--- 错误: 编译安装 DISO 失败！ ---\n")
-                self.output_received.emit("注意: 程序没有 DISO 依然可以尝试运行，但将无法使用 dmc 算法\n")
-                self.output_received.emit("--- 回退到兼容模式 mc 算法 ---\n")
-
-            # 通用的 pip 安装 + pyd 复制函数
-            def _install_and_copy(pkg_dir, pkg_name, pyd_src_rel=None, pyd_dst_rel=None):
-                """编译安装指定包，并按需复制 pyd 文件"""
-                if not self.is_running: return False
-                self.status_update.emit(f"编译安装 {pkg_name}...")
-                self.output_received.emit(f"编译安装 {pkg_name}...")
-                result = pip_install(str(pkg_dir))
-                if not self.is_running: return False
-                if result != 0:
-                    self.output_received.emit(f"错误: 编译安装 {pkg_name} 失败！")
-                    self.process_finished.emit(-1)
-                    return False
-                if pyd_src_rel and pyd_dst_rel:
-                    src = Path(pkg_dir) / pyd_src_rel
-                    dst = Path(pkg_dir) / pyd_dst_rel
-                    if src.exists():
-                        shutil.copy(src, dst)
-                        self.output_received.emit(f"复制文件: {pyd_dst_rel}")
-                return True
-
-            def install_hy3d2():
-                base = os.path.join(RUN_PATH, "Hunyuan3D-2", "hy3dgen", "texgen")
-                if not _install_and_copy(
-                    os.path.join(base, "custom_rasterizer"),
-                    "custom_rasterizer"
-                ):
-                    return False
-                if not _install_and_copy(
-                    os.path.join(base, "differentiable_renderer"),
-                    "differentiable_renderer",
-                    os.path.join("build", "lib.win-amd64-cpython-312", "mesh_processor.cp312-win_amd64.pyd"),
-                    "mesh_processor.cp312-win_amd64.pyd",
-                ):
-                    return False
-                return True
-
-            def install_hy3d2_vanilla():
-                base = os.path.join(RUN_PATH, "Hunyuan3D-2-vanilla", "hy3dgen", "texgen")
-                if not _install_and_copy(
-                    os.path.join(base, "custom_rasterizer"),
-                    "custom_rasterizer"
-                ):
-                    return False
-                if not _install_and_copy(
-                    os.path.join(base, "differentiable_renderer"),
-                    "differentiable_renderer",
-                    os.path.join("build", "lib.win-amd64-cpython-312", "mesh_processor.cp312-win_amd64.pyd"),
-                    "mesh_processor.cp312-win_amd64.pyd",
-                ):
-                    return False
-                return True
-
-            def install_hy3d21():
-                base = os.path.join(RUN_PATH, "Hunyuan3D-2.1", "hy3dpaint")
-                if not _install_and_copy(
-                    os.path.join(base, "custom_rasterizer"),
-                    "custom_rasterizer"
-                ):
-                    return False
-                if not _install_and_copy(
-                    os.path.join(base, "DifferentiableRenderer"),
-                    "DifferentiableRenderer",
-                    os.path.join("build", "lib.win-amd64-cpython-312", "mesh_inpaint_processor.cp312-win_amd64.pyd"),
-                    "mesh_inpaint_processor.cp312-win_amd64.pyd",
-                ):
-                    return False
-                return True
-
-            # 根据不同的程序执行不同的纹理生成设置
-            success = True
-            if program_name == "Hunyuan3D-2":
-                success = install_hy3d2()
-            
-            elif program_name == "Hunyuan3D-2-vanilla":
-                success = install_hy3d2_vanilla()
-                
-            elif program_name == "Hunyuan3D-2.1":
-                success = install_hy3d21()
-
-            elif program_name == "API-Hunyuan3D-2":
-                success = install_hy3d2()
-
+            success = self._build_texture_extensions([folder], env, common_env_vars.get("_compiler_cache") is not False)
             if not self.is_running:
-                self.process_finished.emit(-1)
-                return
-
+                return False
             if not success:
                 self.output_received.emit("\n--- 纹理生成功能设置失败 ---\n")
-                self.process_finished.emit(-1)
-                return
-
+                return False
             self.output_received.emit("\n--- 纹理生成功能设置完毕 ---\n")
 
-        # 步骤 3: 切换到对应目录并启动主脚本
-        program_dir = RUN_PATH / folder
-        self.output_received.emit(f"切换到目录: {program_dir}")
-        
-        command = [PYTHON_EXE, "-s", script_path]
+        def assemble_command():
+            nonlocal command
+            command = self.build_command(self._backend_data(program_data))
+
+        def start_gateway():
+            return self._sync_gateway(program_data, common_env_vars)
+
+        def prepare_models():
+            nonlocal missing_models
+            missing_models = self._prepare_models(model_requirements, env, number_setting(common_env_vars, "_hub_cache_budget_gb", 0, float))
+            return missing_models is not None
+
+        def spawn_program():
+            nonlocal spawned_at
+            child_env = self._offline_env(env, model_requirements, missing_models, common_env_vars)
+            self.output_received.emit(f"切换到目录: {program_dir}")
+            self.status_update.emit("正在启动子程序...")
+            self.output_received.emit("\n正在启动子程序...\n")
+            self.output_received.emit(f"执行命令:\ncd {program_dir} && {' '.join(command)}\n\n")
+            try:
+                # 切换到程序目录并启动进程
+                self.process = subprocess.Popen(
+                    command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, encoding='utf-8', errors='replace', env=child_env,
+                    cwd=program_dir,  # 关键修改：设置工作目录
+                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+                )
+            except FileNotFoundError:
+                self.output_received.emit(f"错误: 脚本未找到 {script_path}\n")
+                return False
+            spawned_at = time.monotonic()
+            self._start_readiness_probe(self._backend_data(program_data), common_env_vars, command)
+            self._start_telemetry(common_env_vars)
+            # 主进程崩溃后只重新启动它，其他进程继续运行
+            if not self.replicas:
+                self.replicas = self._start_replicas(program_data, program_dir, child_env, self.backend_ports)
+
+        def switch_over():
+            # 蓝绿重启: 新选项在其他内部端口上启动，期间运行中的服务继续响应；
+            # 返回之后运行的程序的输出读取器
+            nonlocal program_data, model_requirements, missing_models, command, spawned_at
+            from launcher_core.logpipe import PipeReader
+            from launcher_core.ports import free_port_range
+            from launcher_core.readiness import server_answers, record_ready_time
+
+            restart, self.restart_request = self.restart_request, None
+            old_process, old_reader, old_replicas = self.process, self.output_reader, self.replicas
+            if restart is None:
+                return old_reader
+            count = self._replica_count(restart)
+            try:
+                first = free_port_range(count)
+            except OSError as e:
+                self.output_received.emit(f"错误: 没有可供新配置使用的内部端口: {e}\n")
+                return old_reader
+            ports = list(range(first, first + count))
+            requirements = self._model_requirements(restart)
+            missing = (missing_models or []) + [r for r in requirements if r not in model_requirements]
+            child_env = self._offline_env(env, requirements, missing, common_env_vars)
+            new_command = self.build_command(self._backend_data(restart, 0, ports))
+            listed = ", ".join(str(port) for port in ports)
+            self.output_received.emit(f"正在 127.0.0.1 端口 {listed} 上启动新配置")
+            self.output_received.emit(f"执行命令:\ncd {program_dir} && {' '.join(new_command)}\n\n")
+            started = time.monotonic()
+            try:
+                process = subprocess.Popen(
+                    new_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, encoding='utf-8', errors='replace', env=child_env, cwd=program_dir,
+                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+                )
+            except FileNotFoundError:
+                self.output_received.emit(f"错误: 找不到脚本 {script_path}\n")
+                return old_reader
+            reader = PipeReader(process.stdout, self._emit_output_batch).start()
+            replicas = self._start_replicas(restart, program_dir, child_env, ports)
+            path = str(common_env_vars.get("_ready_http_path", "")).strip() or None
+            timeout = number_setting(common_env_vars, "_ready_timeout", 1800, float)
+            while self.is_running and process.poll() is None and time.monotonic() - started < timeout:
+                if all(server_answers("127.0.0.1", port, path) for port in ports):
+                    break
+                time.sleep(0.5)
+            else:
+                for replica in replicas:
+                    replica.stop(self._kill_process_tree)
+                self._kill_process_tree(process.pid)
+                reader.join(5)
+                if self.is_running:
+                    self.output_received.emit("\n--- 新配置未能就绪；原服务继续以旧选项响应 ---\n")
+                    self.status_update.emit("以旧选项运行中")
+                return old_reader
+            seconds = time.monotonic() - started
+            self.timeline.add("启动新配置", started, time.monotonic())
+            record_ready_time(READY_TIMES_FILE, restart['program_name'], seconds, new_command[2:])
+
+            # 对客户端而言只有一步: 此后所有新请求都发往新服务
+            retired = self.gateway.pool.switch([("127.0.0.1", port) for port in ports])
+            pending = sum(backend.in_flight for backend in retired)
+            jobs = self.gateway.pool.open_jobs(retired)
+            host, port = self.gateway.host, self.gateway.port
+            self.output_received.emit(f"\n--- {seconds:.1f} 秒后就绪: {host}:{port} 已切换到新配置；正在等待旧服务上 {pending} 个进行中的请求和 {jobs} 个已开始的任务完成 ---\n")
+            self.status_update.emit(f"已就绪 (启动后 {seconds:.1f} 秒)")
+            self.backend_ports, self.replicas = ports, replicas
+            self._sync_gateway(restart, common_env_vars)
+            self.gateway.touch()
+            self.program_ready.emit(seconds)
+            drain_started = time.monotonic()
+            dropped = self.gateway.pool.drain(retired, lambda: self.is_running)
+            drained = time.monotonic() - drain_started
+            for replica in old_replicas:
+                replica.stop(self._kill_process_tree)
+            self._kill_process_tree(old_process.pid)
+            old_reader.join(5)
+            self._stop_telemetry()
+            if old_reader.first_line_at:
+                self.timeline.add("等待首次输出", spawned_at, old_reader.first_line_at)
+            self.timeline.add("程序运行", spawned_at, time.monotonic(), "program")
+            self.timeline.add("排空旧服务", drain_started, time.monotonic())
+            if dropped:
+                self.output_received.emit(f"--- 旧服务上有 {dropped} 个任务在超时前未被取回，已丢弃 ---\n")
+            self.output_received.emit(f"--- 旧服务在排空 {drained:.1f} 秒后已停止 ---\n")
+            program_data, model_requirements, missing_models, command = restart, requirements, missing, new_command
+            self.process, spawned_at = process, started
+            self._start_telemetry(common_env_vars)
+            return reader
+
+        # 步骤 2: 以步骤图描述启动过程，互不依赖的步骤并行执行
+        u2net_step = Step("复制 u2net.onnx", copy_u2net, inputs=[bundled_u2net], outputs=[user_u2net])
+        hub_step = Step("重装 huggingface-hub", reinstall_hub)
+        build_steps = []
+        if params.get("_enable_texture_gen", False):
+            # 自上次设置成功以来扩展源码、已安装的软件包和编译工具链均未变化时跳过
+            toolchain = hashlib.sha256(toolchain_fingerprint(env).encode("utf-8")).hexdigest()[:16]
+            build_steps.append(Step(
+                "纹理生成功能设置", build_extensions, deps=[hub_step],
+                inputs=[RUN_PATH / ext['dir'] for ext in TEXTURE_EXTENSIONS.get(folder, [])],
+                shallow_inputs={sysconfig.get_path("purelib"), sysconfig.get_path("platlib")},
+                outputs=[RUN_PATH / ext['dir'] / ext['pyd_dst'] for ext in TEXTURE_EXTENSIONS.get(folder, []) if ext.get('pyd_dst')],
+                stamp=CACHE_PATH / "steps" / f"{folder}-texture-{toolchain}.stamp"))
+        drift_step = Step("检查已安装的软件包", self._report_package_drift, deps=[hub_step] + build_steps)
+        # 与纹理生成功能设置同时校验并下载模型，两个耗时阶段相互重叠
+        model_step = Step("检查模型", prepare_models, deps=[hub_step])
+        # 命令行让服务监听请求队列转发到的内部端口
+        gateway_steps = [Step("启动请求队列", start_gateway)] if self._gateway_enabled(program_data) else []
+        command_step = Step("生成启动命令", assemble_command, deps=gateway_steps)
+        steps = [u2net_step, hub_step, model_step] + build_steps + gateway_steps + [drift_step, command_step]
+        spawn_step = Step("启动子进程", spawn_program, deps=steps)
+        step_starts = {}
+
+        def on_step_start(step):
+            step_starts[step.name] = (time.monotonic(), threading.current_thread().name)
+
+        def on_step_done(step):
+            if step.name in step_starts:
+                start, lane = step_starts[step.name]
+                self.timeline.add(step.name, start, start + step.seconds, "step", lane)
+            if step.status == SKIPPED:
+                self.output_received.emit(f"{step.name}: 已是最新，跳过")
+            elif step.status == FAILED and step.error:
+                self.output_received.emit(f"发生意外错误: {step.error}\n")
+
+        results = StepGraph(steps + [spawn_step]).run(lambda: self.is_running, on_step_start, on_step_done)
+        if results[spawn_step.name] != DONE:
+            self._close_gateway()
+            self.process_finished.emit(-1)
+            self.is_running = False
+            return
+
+        # 步骤 3: 转发程序输出直到其退出；热重启时以新选项重新启动程序，或切换到以新选项启动的程序
+        self.texture_prepared = bool(build_steps)
+        self.can_restart = True
+        threading.Thread(target=self._watch_idle, name="idle-watch", daemon=True).start()
+        from launcher_core.replicas import STABLE_SECONDS, restart_delay
+        crashes = 0
+        try:
+            reader = None
+            while True:
+                if self._pump_output(self.process, reader) is None:
+                    try:
+                        reader = switch_over()
+                    finally:
+                        self.switching = False
+                    continue
+                reader = None
+                self._stop_telemetry()
+                if self.output_reader.first_line_at:
+                    self.timeline.add("等待首次输出", spawned_at, self.output_reader.first_line_at)
+                self.timeline.add("程序运行", spawned_at, time.monotonic(), "program")
+                if self.idle_stopped and self.is_running and self.restart_request is None:
+                    self._sleep_until_request()
+                restart, self.restart_request = self.restart_request, None
+                woken, self.idle_stopped = self.idle_stopped, False
+                self.switching = False
+                # 有多个服务进程时，主进程与其他进程一样受到监控，退出后会被重启
+                crashed = self.is_running and restart is None and not woken and bool(self.replicas)
+                if crashed:
+                    crashes = crashes + 1 if time.monotonic() - spawned_at < STABLE_SECONDS else 0
+                    self.output_received.emit(f"\n--- 第 1 个服务进程已退出（退出码: {self.process.returncode}），正在重启 ---\n")
+                    restart_at = time.monotonic() + restart_delay(crashes)
+                    while self.is_running and self.restart_request is None and time.monotonic() < restart_at:
+                        time.sleep(0.1)
+                    restart, self.restart_request = self.restart_request, None
+                    if restart is not None:
+                        # 没有可供切换的运行中服务，修改后的选项按普通重启启动
+                        self.switching = False
+                        self._stop_replicas()
+                if not self.is_running or (restart is None and not woken and not crashed):
+                    if self.is_running:
+                        self.process_finished.emit(self.process.returncode)
+                    break
+                if restart is not None:
+                    # 保留环境变量、已安装的软件包与编译结果，只重新生成命令行
+                    program_data = restart
+                    new_requirements = self._model_requirements(program_data)
+                    missing_models = (missing_models or []) + [r for r in new_requirements if r not in model_requirements]
+                    model_requirements = new_requirements
+                    if not self._sync_gateway(program_data, common_env_vars):
+                        self.process_finished.emit(-1)
+                        break
+                    with self.timeline.span("生成启动命令"):
+                        assemble_command()
+                # 新的服务进程响应之前，已停止的服务不得接收请求
+                if self.gateway and (restart is not None or woken):
+                    self.gateway.resume()
+                with self.timeline.span("重新启动子进程"):
+                    respawned = spawn_program()
+                if respawned is False:
+                    self.process_finished.emit(-1)
+                    break
+        except Exception as e:
+            self.output_received.emit(f"发生意外错误: {e}\n")
+            self.process_finished.emit(-1)
+        self._stop_replicas()
+        self._close_gateway()
+        self.can_restart = False
+        self.is_running = False
+
+    def _report_package_drift(self):
+        """报告自上次启动以来发生变化的软件包，并记录当前的软件包集合。"""
+        from launcher_core.depprobe import installed_distributions, load_snapshot, save_snapshot, snapshot_drift
+        installed = installed_distributions()
+        drift = snapshot_drift(load_snapshot(DIST_SNAPSHOT_FILE), installed)
+        if drift:
+            self.output_received.emit(f"自上次启动以来已安装的软件包有变化 ({len(drift)} 个):")
+            for name, old, new in drift[:10]:
+                self.output_received.emit(f"  {name}: {old or '(新增)'} -> {new or '(已移除)'}")
+            if len(drift) > 10:
+                self.output_received.emit(f"  ... 另有 {len(drift) - 10} 个")
+        save_snapshot(DIST_SNAPSHOT_FILE, installed)
+
+    def _model_requirements(self, program_data):
+        """按 PROGRAMS 中的声明，返回程序在当前参数下加载的模型仓库。"""
+        from launcher_core.hfcache import ModelRequirement
+        params = program_data['parameters']
+        defaults = {p['name']: p.get('default') for p in program_data['definition'].get('parameters', [])}
+        requirements = []
+        for model in program_data['definition'].get('models', []):
+            if model.get('texture') and params.get("_enable_texture_gen", False) is not True:
+                continue
+            if model.get('choice'):
+                # 由选项参数决定仓库和子目录，如混元3D-2的模型选择
+                repo_id, subfolder = model['options'].get(params.get(model['choice'], defaults.get(model['choice'])), ("", ""))
+            else:
+                # 由参数指定仓库和子目录，没有这类选项的程序使用固定值
+                repo_id = str(params.get(model.get('repo'), defaults.get(model.get('repo'))) or model.get('repo_id') or "").strip()
+                subfolder = str(params.get(model.get('subfolder'), defaults.get(model.get('subfolder'))) or model.get('subfolder_name') or "").strip()
+            # 布尔选项会从相邻的子目录加载变体，如 --turbo
+            for name, suffix in model.get('suffixes', {}).items():
+                if subfolder and params.get(name, defaults.get(name)) is True:
+                    subfolder += suffix
+            # 填写本地目录而非仓库名时直接使用
+            if not repo_id or Path(repo_id).is_dir():
+                continue
+            requirement = ModelRequirement(repo_id, subfolder)
+            if requirement not in requirements:
+                requirements.append(requirement)
+        return requirements
+
+    def _prepare_models(self, requirements, env, budget_gb=0):
+        """校验模型在 hub 缓存中的文件，按 budget_gb 腾出空间，下载缺失或损坏的部分。
+
+        返回之后仍缺失的模型，运行被停止时返回 None。
+        """
+        from launcher_core.hfcache import hub_cache_dir, BlobVerifier, check_models, discard_files, download_command, file_patterns
+        from launcher_core.hubbudget import UsageLog
+        from launcher_core.scheduler import BuildJob, BuildScheduler
+        from launcher_core.telemetry import format_bytes
+
+        cache_dir = hub_cache_dir(env)
+        verifier = BlobVerifier(MODEL_VERIFY_FILE, should_continue=lambda: self.is_running)
+        results = check_models(cache_dir, requirements, verifier, env.get("HY3DGEN_MODELS"))
+        if not self.is_running:
+            return None
+        jobs = []
+        fetched = []
+        missing = []
+        for requirement, problem, files in results:
+            if problem is None:
+                self.output_received.emit(f"模型 {requirement}: 已在本地缓存中")
+                continue
+            patterns = None
+            if problem == "corrupt":
+                self.output_received.emit(f"模型 {requirement}: {len(files)} 个文件校验失败，重新下载")
+                # 只下载被删除的文件，整个仓库可能有几十 GB
+                patterns = file_patterns(cache_dir, requirement, files)
+                discard_files(files)
+            elif requirement.subfolder:
+                self.output_received.emit(f"模型 {requirement}: 不在 {cache_dir} 中，正在后台下载")
+            else:
+                # 未指定子目录时，只有程序自己知道需要仓库中的哪些文件
+                self.output_received.emit(f"模型 {requirement}: 不在 {cache_dir} 中，将由程序在首次使用时下载")
+                missing.append(requirement)
+                continue
+            job = BuildJob(f"下载 {requirement}", download_command(PYTHON_EXE, requirement, patterns), lock_key=f"model:{requirement}")
+            jobs.append(job)
+            fetched.append(requirement)
+        if verifier.hashed_files:
+            self.output_received.emit(f"已校验 {verifier.hashed_files} 个模型文件 ({format_bytes(verifier.hashed_bytes)}) ，耗时 {verifier.seconds:.1f} 秒")
+        usage = UsageLog(HUB_USAGE_FILE)
+        usage.touch(cache_dir, requirements)
+        # 先清理再下载，以免下载时磁盘空间耗尽
+        if budget_gb > 0:
+            self._enforce_hub_budget(cache_dir, requirements, budget_gb, usage)
+        if not jobs:
+            return missing
+
+        def on_done(job):
+            if job.returncode == 0:
+                self.output_received.emit(f"[{job.tag}] 完成，耗时 {job.seconds:.0f} 秒")
+            elif self.is_running:
+                self.output_received.emit(f"[{job.tag}] 失败（退出码: {job.returncode}），程序启动后会自行重试下载")
+
+        self.prefetcher = BuildScheduler(env, self.job_output.emit, self._kill_process_tree, lambda: self.is_running)
+        try:
+            self.prefetcher.run(jobs, None, on_done)
+        finally:
+            self.prefetcher = None
+        if not self.is_running:
+            return None
+        # 下载也可能成功返回却没有取得文件，例如无法访问 Hub 但本地已有旧快照时
+        return missing + [r for r, problem, _ in check_models(cache_dir, fetched, verifier, env.get("HY3DGEN_MODELS")) if problem]
+
+    def _enforce_hub_budget(self, cache_dir, requirements, budget_gb, usage):
+        """删除超出 budget_gb 的最久未使用的 hub 缓存版本，保留 requirements 所需的一切。"""
+        from launcher_core.hfcache import snapshot_dir
+        from launcher_core.hubbudget import enforce_budget, revision_key
+        from launcher_core.startup import process_start_time
+        from launcher_core.telemetry import format_bytes
+
+        needed = {}
+        for requirement in requirements:
+            snapshot = snapshot_dir(cache_dir, requirement.repo_id, requirement.revision)
+            needed.setdefault(requirement.repo_id, set()).add(snapshot.name if snapshot else None)
+        session_start = process_start_time()
+
+        def protected(repo_id, commit):
+            # 本启动器之前启动的程序可能仍在加载它们的模型版本
+            if usage.last_used.get(revision_key(repo_id, commit), 0) >= session_start:
+                return True
+            # 尚待下载的仓库可能复用其他版本的文件
+            commits = needed.get(repo_id)
+            return commits is not None and (commit in commits or None in commits)
+
+        budget_bytes = int(budget_gb * 1024 ** 3)
+        evicted, total = enforce_budget(cache_dir, budget_bytes, protected, usage.last_used)
+        for repo_id, commit, freed in evicted:
+            used = usage.last_used.pop(revision_key(repo_id, commit), None)
+            used = time.strftime("%Y-%m-%d", time.localtime(used)) if used else "本启动器从未使用"
+            self.output_received.emit(f"模型缓存: 已删除 {repo_id}@{commit[:8]} (上次使用: {used}, 释放 {format_bytes(freed)})")
+        if evicted:
+            usage.save()
+        if total > budget_bytes:
+            self.output_received.emit(f"模型缓存: {format_bytes(total)} 仍超出容量上限 {budget_gb:g} GB，其余模型均在使用中")
+
+    def _offline_env(self, env, requirements, missing, common_env_vars):
+        """程序声明的模型均已在缓存中时，返回切换为 Hub 离线模式的环境变量。"""
+        if common_env_vars.get("_auto_offline") is False or not requirements or env.get("HF_HUB_OFFLINE"):
+            return env
+        # 只有指定子目录时文件才是确定的；对整个仓库，程序可能需要缓存中没有的文件
+        online = missing + [r for r in requirements if not r.subfolder and r not in missing]
+        if online:
+            self.output_received.emit(f"以在线模式启动，以下模型不确定是否已完整缓存: {', '.join(map(str, online))}")
+            return env
+        self.output_received.emit("所有模型均已在本地缓存中，以离线模式启动 (HF_HUB_OFFLINE=1, TRANSFORMERS_OFFLINE=1)")
+        return dict(env, HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1")
+
+    def _start_readiness_probe(self, program_data, common_env_vars, command):
+        """在启动的程序接受连接时发出通知，并记录其就绪耗时。"""
+        from launcher_core.ports import program_endpoint
+        from launcher_core.readiness import ReadinessProbe, record_ready_time
+
+        endpoint = program_endpoint(program_data['script'], program_data['parameters'])
+        if not endpoint:
+            return
+        host, port = endpoint
+        process = self.process
+        path = str(common_env_vars.get("_ready_http_path", "")).strip() or None
+
+        def on_ready(seconds):
+            self.timeline.add("等待就绪", probe.started_at, time.monotonic())
+            self.output_received.emit(f"\n--- 已就绪：{host}:{port} 已开始接受连接，启动后 {seconds:.1f} 秒 ---\n")
+            self.status_update.emit(f"已就绪 (启动后 {seconds:.1f} 秒)")
+            self.program_ready.emit(seconds)
+            record_ready_time(READY_TIMES_FILE, program_data['program_name'], seconds, command[2:])
+            if self.gateway:
+                self.gateway.touch()
+            if self.woke_at is not None:
+                cold_start, self.woke_at = time.monotonic() - self.woke_at, None
+                if self.idle_log:
+                    self.idle_log[-1]["cold_start"] = cold_start
+                self.output_received.emit(f"冷启动: 唤醒服务的请求等待了约 {cold_start:.1f} 秒")
+
+        def on_timeout(seconds):
+            self.output_received.emit(f"\n--- {seconds:.0f} 秒后仍未就绪：{host}:{port} 无响应 ---\n")
+
+        self.output_received.emit(f"正在等待 {host}:{port} 接受连接...")
+        probe = ReadinessProbe(host, port, path, timeout=number_setting(common_env_vars, "_ready_timeout", 1800, float))
+        probe.start(on_ready, on_timeout, lambda: self.is_running and process.poll() is None)
+
+    def _start_telemetry(self, common_env_vars):
+        interval = number_setting(common_env_vars, "_telemetry_interval", 1.0, float)
+        if interval <= 0:
+            return
+        from launcher_core.telemetry import TreeSampler
+        self.sampler = TreeSampler(self.process.pid, interval).start()
+        self.telemetry_started.emit(self.sampler)
+
+    def _stop_telemetry(self):
+        sampler = self.sampler
+        if sampler:
+            from launcher_core.telemetry import format_bytes
+            sampler.stop()
+            self.output_received.emit(f"进程树内存峰值: {format_bytes(sampler.peak_rss)} RSS")
+
+    def _queue_limit(self, program_data):
+        """请求队列每次交给每个服务进程的请求数，0 表示不限制。"""
+        if not program_data['definition'].get('gateway'):
+            return 0
+        return max(0, number_setting(program_data['parameters'], "_queue_limit", 0))
+
+    def _replica_count(self, program_data):
+        """在启动器端口之后启动的服务进程数，没有副本的程序为 1。"""
+        if not program_data['definition'].get('gateway'):
+            return 1
+        return max(1, number_setting(program_data['parameters'], "_replicas", 1))
+
+    def _result_cache_bytes(self, program_data):
+        """程序结果缓存的大小上限，没有结果缓存时为 0。"""
+        if not program_data['definition'].get('gateway'):
+            return 0
+        return int(max(0, number_setting(program_data['parameters'], "_result_cache_mb", 0, float)) * 1024 * 1024)
+
+    def _result_cache_config(self, program_data):
+        """会改变程序生成结果的设置，是每个结果缓存键的一部分。"""
+        params = program_data['parameters']
+        # 监听地址与启动器选项不影响结果；纹理生成会影响
+        config = {key: value for key, value in params.items() if not key.startswith("_") and key not in ("--host", "--port")}
+        config["_enable_texture_gen"] = params.get("_enable_texture_gen", False) is True
+        config["script"] = program_data['script']
+        return config
 
-        # 特殊处理混元3D-2的模型选择参数
-        if program_name == "Hunyuan3D-2":
-            model_select = params.get("_model_select", "--mini")
-            if model_select:
-                command.append(model_select)
+    def _idle_limit(self, program_data):
+        """无请求多少秒后停止服务进程，0 表示一直运行。"""
+        if not program_data['definition'].get('gateway'):
+            return 0
+        return max(0, number_setting(program_data['parameters'], "_idle_minutes", 0, float)) * 60
+
+    def _zero_downtime(self, program_data):
+        """热重启时是否在运行中的服务旁启动新选项，并在其响应后切换端口。"""
+        return bool(program_data['definition'].get('gateway')) and program_data['parameters'].get("_blue_green", False) is True
+
+    def _gateway_enabled(self, program_data):
+        """是否由启动器自己监听程序端口并转发给服务进程。"""
+        return bool(self._queue_limit(program_data) or self._result_cache_bytes(program_data) or self._idle_limit(program_data) or self._zero_downtime(program_data)) or self._replica_count(program_data) > 1
+
+    def _backend_data(self, program_data, index=0, ports=None):
+        """第 index 个服务进程的运行请求；由启动器转发时服务监听内部端口。"""
+        if ports is None:
+            if not self.gateway:
+                return program_data
+            ports = self.backend_ports
+        parameters = dict(program_data['parameters'], **{"--host": "127.0.0.1", "--port": str(ports[index])})
+        return dict(program_data, parameters=parameters)
+
+    def _sync_gateway(self, program_data, common_env_vars):
+        """按程序参数启动、调整或停止转发与请求队列；端口被占用时返回 False。"""
+        from launcher_core.gateway import Gateway, METRICS_PATH
+        from launcher_core.ports import program_endpoint, connect_host, free_port_range
+        from launcher_core.resultcache import ResultCache
+        from launcher_core.telemetry import format_bytes
+
+        limit = self._queue_limit(program_data)
+        replicas = self._replica_count(program_data)
+        endpoint = program_endpoint(program_data['script'], program_data['parameters'])
+        enabled = self._gateway_enabled(program_data) and endpoint
+        self.idle_limit = self._idle_limit(program_data)
+        if self.gateway and (not enabled or (self.gateway.host, self.gateway.port) != endpoint):
+            self._close_gateway()
+        if not enabled:
+            return True
+        # 进程数不变时在热重启间保持不变，转发目标也随之不变
+        if len(self.backend_ports) != replicas:
+            try:
+                first = free_port_range(replicas)
+            except OSError as e:
+                self.output_received.emit(f"错误: 没有可供服务进程使用的内部端口: {e}\n")
+                return False
+            self.backend_ports = list(range(first, first + replicas))
+        backends = [("127.0.0.1", port) for port in self.backend_ports]
+        host, port = endpoint
+        if self.gateway:
+            self.gateway.pool.set_addresses(backends)
+            self.gateway.queue.set_limit(limit * replicas)
+        else:
+            path = str(common_env_vars.get("_ready_http_path", "")).strip() or None
+            ready_timeout = number_setting(common_env_vars, "_ready_timeout", 1800, float)
+            try:
+                self.gateway = Gateway(host, port, backends, limit * replicas, health_path=path, ready_timeout=ready_timeout).start()
+            except OSError as e:
+                self.output_received.emit(f"错误: 启动器无法监听 {host}:{port}: {e}\n")
+                return False
+        ports = ", ".join(str(p) for p in self.backend_ports)
+        self.output_received.emit(f"启动器监听 {host}:{port}，转发给 127.0.0.1 端口 {ports} 上的 {replicas} 个服务进程")
+        cache_bytes = self._result_cache_bytes(program_data)
+        self.gateway.cache = ResultCache(RESULT_CACHE_PATH / program_data['program_name'], cache_bytes) if cache_bytes else None
+        self.gateway.cache_config = self._result_cache_config(program_data)
+        if cache_bytes:
+            stats = self.gateway.cache.stats()
+            entries, size = stats['entries'], format_bytes(stats['bytes'])
+            self.output_received.emit(f"结果缓存: {entries} 个结果，{size} / {format_bytes(cache_bytes)}，位于 {RESULT_CACHE_PATH / program_data['program_name']}")
+        self.gateway.wake = self.wake_event.set
+        if self.idle_limit:
+            minutes = self.idle_limit / 60
+            self.output_received.emit(f"空闲策略: 服务进程在 {minutes:g} 分钟无请求后停止，收到下一个请求时重新启动")
+        if limit:
+            self.output_received.emit(f"请求队列: 每个服务进程每次最多处理 {limit} 个请求")
+        self.output_received.emit(f"队列指标: http://{connect_host(host)}:{port}{METRICS_PATH}")
+        return True
+
+    def _close_gateway(self):
+        """停止转发，并报告请求的等待时间与去向。"""
+        gateway, self.gateway = self.gateway, None
+        if not gateway:
+            return
+        gateway.close()
+        metrics = gateway.metrics()
+        if 'cache' in metrics:
+            cache = metrics['cache']
+            hits, misses, collapsed = cache['hits'], cache['misses'], cache['collapsed']
+            self.output_received.emit(f"结果缓存: {hits} 个从磁盘返回，{collapsed} 个合并到相同请求，{misses} 个重新生成")
+        if self.idle_log:
+            from launcher_core.telemetry import format_bytes
+            stops = len(self.idle_log)
+            asleep = sum(entry.get("asleep", 0) for entry in self.idle_log)
+            freed = format_bytes(sum(entry["freed"] for entry in self.idle_log) / stops)
+            # 随时间累计少占用的内存，即空闲停止所节省的量
+            gb_hours = sum(entry["freed"] * entry.get("asleep", 0) for entry in self.idle_log) / 3600 / 1024 ** 3
+            self.output_received.emit(f"空闲停止: {stops} 次，共停止 {asleep / 60:.1f} 分钟，每次释放 {freed} RSS（节省 {gb_hours:.2f} GB·小时）")
+            cold_starts = [entry["cold_start"] for entry in self.idle_log if "cold_start" in entry]
+            if cold_starts:
+                mean, longest = sum(cold_starts) / len(cold_starts), max(cold_starts)
+                self.output_received.emit(f"冷启动: {len(cold_starts)} 次，唤醒请求平均等待 {mean:.1f} 秒，最长 {longest:.1f} 秒")
+        admitted, rejected = sum(metrics['admitted'].values()), sum(metrics['rejected'].values())
+        if not admitted and not rejected:
+            return
+        self.output_received.emit(f"请求队列: 放行 {admitted} 个请求，拒绝 {rejected} 个")
+        for priority, waits in metrics['wait_seconds'].items():
+            if waits['samples']:
+                count, mean, p95, longest = waits['samples'], waits['mean'], waits['p95'], waits['max']
+                self.output_received.emit(f"  {priority}: {count} 个请求，平均等待 {mean:.1f} 秒，p95 {p95:.1f} 秒，最长 {longest:.1f} 秒")
+        if len(metrics['backends']) > 1:
+            for backend in metrics['backends']:
+                self.output_received.emit(f"  {backend['address']}: 处理了 {backend['served']} 个请求")
+
+    def _start_replicas(self, program_data, program_dir, child_env, ports):
+        """在主进程之外启动第 2 个及以后的服务进程，每个进程退出后都会被重启。"""
+        from launcher_core.replicas import Replica
+
+        def sink(replica, lines):
+            prefix = f"[服务 {replica.index}] "
+            self.output_received.emit("".join(prefix + line for line in lines))
+
+        def on_exit(replica, returncode):
+            if returncode is None:
+                self.output_received.emit(f"错误: 无法启动第 {replica.index} 个服务进程\n")
+            elif self.is_running:
+                self.output_received.emit(f"\n--- 第 {replica.index} 个服务进程已退出（退出码: {returncode}），正在重启 ---\n")
+
+        count = len(ports) if self.gateway else 1
+        replicas = []
+        for index in range(1, count):
+            command = self.build_command(self._backend_data(program_data, index, ports))
+            self.output_received.emit(f"正在启动第 {index + 1}/{count} 个服务进程，端口 127.0.0.1:{ports[index]}")
+            replicas.append(Replica(index + 1, command, program_dir, child_env, sink, on_exit).start())
+        return replicas
+
+    def _stop_replicas(self):
+        """停止额外的服务进程及其监护。"""
+        replicas, self.replicas = self.replicas, []
+        for replica in replicas:
+            replica.stop(self._kill_process_tree)
+
+    def _watch_idle(self):
+        """在无请求需要服务进程达到空闲时限时停止它们，直到运行结束。"""
+        from launcher_core.telemetry import tree_rss, format_bytes
+
+        while self.can_restart and self.is_running:
+            time.sleep(IDLE_CHECK_SECONDS)
+            gateway, process = self.gateway, self.process
+            if not (gateway and self.idle_limit and not self.idle_stopped and not self.switching and process and process.poll() is None):
+                continue
+            # 先清除，这样服务刚停止后到达的请求仍能唤醒它们
+            self.wake_event.clear()
+            if not gateway.try_sleep(self.idle_limit):
+                continue
+            freed = tree_rss(process.pid) + sum(tree_rss(r.process.pid) for r in self.replicas if r.process)
+            self.idle_log.append({"freed": freed})
+            minutes = self.idle_limit / 60
+            self.output_received.emit(f"\n--- {minutes:g} 分钟无请求: 停止服务进程以释放 {format_bytes(freed)} RSS；下一个请求将重新启动它们 ---\n")
+            self.idle_stopped = True
+            self._stop_replicas()
+            self._kill_process_tree(process.pid)
+
+    def _sleep_until_request(self):
+        """服务因空闲而停止期间，等待请求、热重启或停止。"""
+        asleep_at = time.monotonic()
+        self.status_update.emit("空闲已停止；下一个请求将重新启动服务")
+        while self.is_running and self.restart_request is None and not self.wake_event.wait(0.5):
+            pass
+        woke_at = time.monotonic()
+        self.idle_log[-1]["asleep"] = woke_at - asleep_at
+        self.timeline.add("空闲停止", asleep_at, woke_at, "program")
+        if self.is_running and self.restart_request is None:
+            self.woke_at = woke_at
+            self.output_received.emit("\n--- 收到请求: 正在重新启动服务进程 ---\n")
+
+    def build_command(self, program_data):
+        """返回以当前参数启动程序的命令行。"""
+        params = program_data['parameters']
+        definition = program_data['definition']
+        command = [PYTHON_EXE, "-s", program_data['script']]
 
-        # 未勾选时，主动禁用材质生成
-        if program_name in ["Hunyuan3D-2", "Hunyuan3D-2-vanilla", "Hunyuan3D-2.1"]:
-            if enable_texture_gen == False:
-                command.append("--disable_tex")
+        # 取值本身就是命令行开关的选项，例如混元3D-2的模型选择
+        defaults = {p['name']: p.get('default') for p in definition.get('parameters', [])}
+        for name in definition.get('flag_parameters', []):
+            flag = params.get(name, defaults.get(name))
+            if flag:
+                command.append(flag)
 
-        if program_name == "API-Hunyuan3D-2":
-            if enable_texture_gen == True:
-                command.append("--enable_tex")
+        # 各程序分别用开关禁用或启用材质生成
+        texture_flag = definition.get('texture_flags', {}).get(params.get("_enable_texture_gen", False) is True)
+        if texture_flag:
+            command.append(texture_flag)
 
         # 添加其他参数
         for key, value in params.items():
@@ -381,36 +1037,270 @@ class ProcessWorker(QObject):
             elif isinstance(value, (int, float)):
                 command.append(key)
                 command.append(str(value))
+        return command
 
-        self.status_update.emit("正在启动子程序...")
-        self.output_received.emit(f"\n正在启动子程序...\n")
-        self.output_received.emit(f"执行命令:\ncd {program_dir} && {' '.join(command)}\n\n")
+    def _pump_output(self, process, reader=None):
+        """分批转发子进程输出直至其退出；若被停止则终止其进程树。
 
+        reader 为已在该进程上启动的输出读取器，将继续使用。请求切换到新选项时返回 None，
+        此时程序仍在运行。
+        """
+        import subprocess
+        from launcher_core.logpipe import PipeReader
+
+        reader = self.output_reader = reader or PipeReader(process.stdout, self._emit_output_batch).start()
+        while True:
+            try:
+                process.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                if not self.is_running:
+                    self._kill_process_tree(process.pid)
+                    reader.join(5)
+                    return -1
+                if self.switching:
+                    return None
+        reader.join()
+        return process.returncode
+
+    def _emit_output_batch(self, lines):
+        self.output_received.emit("".join(lines))
+
+    def _open_run_log(self, name, common_env_vars):
+        from launcher_core.runlog import RunLogWriter, prune_run_logs
+
+        prune_run_logs(LOGS_PATH, number_setting(common_env_vars, "_log_keep_runs", 20))
+        path = LOGS_PATH / f"{time.strftime('%Y%m%d-%H%M%S')}_{name}.log"
+        self.run_log = RunLogWriter(
+            path,
+            max_bytes=int(number_setting(common_env_vars, "_log_max_mb", 10, float) * 1024 * 1024),
+            backup_count=number_setting(common_env_vars, "_log_backups", 5),
+            compress=common_env_vars.get("_log_compress") is True,
+        )
+        self.output_received.emit(f"运行日志: {path}")
+
+    def _log_output(self, text):
+        run_log = self.run_log
+        if run_log:
+            run_log.write(text)
+
+    def _log_job_output(self, tag, text):
+        run_log = self.run_log
+        if run_log:
+            run_log.write("".join(f"[{tag}] {line}\n" for line in text.rstrip("\n").split("\n")))
+
+    def finish_run_log(self, exit_code, wait=False):
+        run_log, self.run_log = self.run_log, None
+        if run_log:
+            run_log.write(f"\n--- 程序运行结束 (退出码: {exit_code}) ---")
+            run_log.close(timeout=5 if wait else 0)
+
+    def _prepare_env(self, common_env_vars):
+        env = os.environ.copy()
+        for key, value in common_env_vars.items():
+            if key.startswith('_'):  # 以下划线开头的选项用于配置启动器本身
+                continue
+            if value:
+                env[key] = value
+                if key.upper() == "HTTP_PROXY": 
+                    env["http_proxy"] = value
+                    self.output_received.emit(f"配置 HTTP 代理服务器: {value}")
+                elif key.upper() == "HTTPS_PROXY": 
+                    env["https_proxy"] = value
+                    self.output_received.emit(f"配置 HTTPS 代理服务器: {value}")
+        return env
+
+    def _pip_command(self, package):
+        return [PYTHON_EXE, "-sm", "pip", "install", "--no-build-isolation", package]
+
+    def _build_texture_extensions(self, source_trees, env, use_compiler_cache=True):
+        """并行编译 DISO 及指定源码树的纹理扩展，返回必需的编译是否全部成功。"""
+        import shutil
+        from launcher_core.buildcache import BuildCache, installed_identity
+        from launcher_core.scheduler import BuildJob, BuildScheduler, SITE_PACKAGES_LOCK
+        from launcher_core.depprobe import installed_distributions
+        from launcher_core.wheelhouse import Wheelhouse, extract_file
+        from launcher_core.ccache import CompilerCache
+
+        # 源码、Python ABI 与工具链均未变化的扩展跳过编译
+        build_cache = BuildCache(BUILD_CACHE_FILE)
+        # 每种源码状态的扩展只在 wheelhouse 中编译一次，并始终从 wheelhouse 安装
+        wheelhouse = Wheelhouse(WHEELHOUSE_PATH, PYTHON_EXE)
+        build_jobs = []
+        pending = {}
+        installed = installed_distributions()
+        if "diso" in installed:
+            self.output_received.emit(f"DISO {installed['diso']} 已安装，跳过编译")
+        else:
+            # DISO 来自 PyPI，没有可计算哈希的本地源码树
+            pending["DISO"] = (None, None, None, "diso", "pypi")
+            if not wheelhouse.find("diso", "pypi"):
+                build_jobs.append(BuildJob("DISO", wheelhouse.build_command("diso", "diso", "pypi")))
+        for tree in source_trees:
+            for ext in TEXTURE_EXTENSIONS.get(tree, []):
+                pkg_dir = RUN_PATH / ext['dir']
+                tag = f"{tree}/{ext['name']}"
+                cache_key = build_cache.make_key(pkg_dir, env)
+                outputs = [pkg_dir / ext['pyd_dst']] if ext.get('pyd_dst') else []
+                cached = build_cache.lookup(pkg_dir, cache_key, outputs, installed_identity(ext['name']))
+                if cached:
+                    self.output_received.emit(f"构建缓存命中: {tag} 自 {cached['built_at']} 以来未变化，跳过编译（节省约 {cached['build_seconds']:.0f} 秒）")
+                    continue
+                pending[tag] = (ext, pkg_dir, cache_key, ext['name'], cache_key['source'])
+                wheel = wheelhouse.find(ext['name'], cache_key['source'])
+                if wheel:
+                    self.output_received.emit(f"wheelhouse 命中: {tag} 已由相同源码编译过，直接安装 {wheel.name}")
+                    continue
+                self.output_received.emit(f"构建缓存未命中: {tag} 的源码或工具链已变化，重新编译")
+                build_jobs.append(BuildJob(tag, wheelhouse.build_command(str(pkg_dir), ext['name'], cache_key['source'])))
+
+        job_starts = {}
+        build_seconds = {}
+
+        def on_start(job):
+            job_starts[job.tag] = time.monotonic()
+            if job.tag in build_seconds:
+                wheel_name = job.command[-1]
+                self.status_update.emit(f"安装 {job.tag}...")
+                self.output_received.emit(f"[{job.tag}] 正在从 wheelhouse 安装 {wheel_name}...")
+            else:
+                self.status_update.emit(f"编译 {job.tag}...")
+                self.output_received.emit(f"[{job.tag}] 正在编译 wheel...")
+
+        def on_done(job):
+            installing = job.tag in build_seconds
+            self.timeline.add(f"安装 {job.tag}" if installing else f"编译 {job.tag}", job_starts[job.tag], time.monotonic(), "build", job.tag)
+            if not installing:
+                build_seconds[job.tag] = job.seconds
+            if job.returncode == 0:
+                self.output_received.emit(f"[{job.tag}] 完成，耗时 {job.seconds:.0f} 秒")
+            elif self.is_running:
+                self.output_received.emit(f"[{job.tag}] 失败（退出码: {job.returncode}），详情见 {job.tag} 标签页")
+
+        build_env = env
+        compiler_cache = CompilerCache.detect(env, COMPILER_CACHE_PATH) if use_compiler_cache and build_jobs else None
+        if compiler_cache:
+            build_env = compiler_cache.apply(env)
+            stats_before = compiler_cache.stats(build_env)
+            self.output_received.emit(f"编译器缓存: 使用 {compiler_cache.kind} ({compiler_cache.exe})，缓存目录 {COMPILER_CACHE_PATH}")
+        self.scheduler = BuildScheduler(build_env, self.job_output.emit, self._kill_process_tree, lambda: self.is_running)
+        if build_jobs:
+            self.output_received.emit(f"编译 {len(build_jobs)} 个包，最多 {min(len(build_jobs), self.scheduler.max_workers)} 个并行；每个编译任务有独立的输出标签页")
         try:
-            # 切换到程序目录并启动进程
-            self.process = subprocess.Popen(
-                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, encoding='utf-8', errors='replace', env=env,
-                cwd=program_dir,  # 关键修改：设置工作目录
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            )
-            for line in iter(self.process.stdout.readline, ''):
-                if not self.is_running: 
-                    self._kill_process_tree(self.process.pid)
-                    break
-                self.output_received.emit(line)
-            self.process.wait()
-            if self.is_running: 
-                self.process_finished.emit(self.process.returncode)
-        except FileNotFoundError:
-            self.output_received.emit(f"错误: 脚本未找到 {script_path}\n")
-            self.process_finished.emit(-1)
-        except Exception as e:
-            self.output_received.emit(f"发生意外错误: {e}\n")
-            self.process_finished.emit(-1)
+            with self.timeline.span("编译纹理扩展", "build"):
+                self.scheduler.run(build_jobs, on_start, on_done)
+            if compiler_cache:
+                stats_after = compiler_cache.stats(build_env)
+                if stats_before and stats_after:
+                    hits, misses = stats_after[0] - stats_before[0], stats_after[1] - stats_before[1]
+                    self.output_received.emit(f"编译器缓存: 本次编译命中 {hits} 次，未命中 {misses} 次（命中率 {hits / max(1, hits + misses):.0%}）")
+            failed = {job.tag for job in build_jobs if job.returncode != 0}
+            wheels = {}
+            install_jobs = []
+            for tag, (ext, pkg_dir, cache_key, name, source_hash) in pending.items():
+                wheel = wheelhouse.find(name, source_hash)
+                if tag in failed or not wheel:
+                    failed.add(tag)
+                    continue
+                wheels[tag] = wheel
+                build_seconds.setdefault(tag, 0.0)
+                install_jobs.append(BuildJob(tag, wheelhouse.install_command(wheel), lock_key=SITE_PACKAGES_LOCK))
+            if self.is_running:
+                with self.timeline.span("安装纹理扩展", "build"):
+                    self.scheduler.run(install_jobs, on_start, on_done)
+        finally:
+            self.scheduler = None
+        if not self.is_running:
+            return False
+        failed.update(job.tag for job in install_jobs if job.returncode != 0)
+
+        success = True
+        for tag, (ext, pkg_dir, cache_key, name, source_hash) in pending.items():
+            if tag == "DISO":
+                if tag in failed:
+                    self.output_received.emit("--- 错误: 编译安装 DISO 失败！ ---\n")
+                    self.output_received.emit("注意: 程序没有 DISO 依然可以尝试运行，但将无法使用 dmc 算法\n")
+                    self.output_received.emit("--- 回退到兼容模式 mc 算法 ---\n")
+                continue
+            if tag in failed:
+                self.output_received.emit(f"错误: 编译安装 {tag} 失败！")
+                success = False
+                continue
+            if ext.get('pyd_src'):
+                src = pkg_dir / ext['pyd_src']
+                dst = pkg_dir / ext['pyd_dst']
+                # 从 wheelhouse 安装不会留下 build 目录，因此直接从 wheel 中取出该文件
+                if src.exists():
+                    shutil.copy(src, dst)
+                    self.output_received.emit(f"复制文件: {dst.relative_to(RUN_PATH)}")
+                elif extract_file(wheels[tag], ext['pyd_dst'], dst):
+                    self.output_received.emit(f"复制文件: {dst.relative_to(RUN_PATH)}")
+            build_cache.record(pkg_dir, cache_key, build_seconds.get(tag, 0.0), installed_identity(name))
+
+        if build_cache.hits or build_cache.misses:
+            self.output_received.emit(f"构建缓存: 命中 {build_cache.hits} 个，未命中 {build_cache.misses} 个，约节省 {build_cache.saved_seconds:.0f} 秒编译时间")
+        return success
+
+    def prebuild_all(self, common_env_vars):
+        """一次性编译所有源码树的纹理扩展，不启动程序。"""
+        self._with_timeline(self._prebuild, common_env_vars)
+
+    def _prebuild(self, common_env_vars):
+        self.is_running = True
+        self._open_run_log("prebuild", common_env_vars)
+        env = self._prepare_env(common_env_vars)
+        source_trees = []
+        for tree in TEXTURE_EXTENSIONS:
+            if (RUN_PATH / tree).exists():
+                source_trees.append(tree)
+            else:
+                self.output_received.emit(f"跳过 {tree}: 目录不存在")
+        self.status_update.emit("正在为所有源码树预编译纹理扩展...")
+        self.output_received.emit("--- 开始预编译全部纹理扩展 ---\n")
+        success = self._build_texture_extensions(source_trees, env, common_env_vars.get("_compiler_cache") is not False)
+        if self.is_running:
+            if success:
+                self.output_received.emit("\n--- 预编译完毕 ---\n")
+            else:
+                self.output_received.emit("\n--- 预编译失败 ---\n")
+            self.process_finished.emit(0 if success else 1)
+        self.is_running = False
+
+    def dedupe_models(self, common_env_vars):
+        """将各缓存与 extras 中内容相同的模型文件替换为指向同一份存储副本的硬链接。"""
+        self._with_timeline(self._dedupe_models, common_env_vars)
+
+    def _dedupe_models(self, common_env_vars):
+        from launcher_core.dedup import ContentStore
+        from launcher_core.hfcache import hub_cache_dir
+        from launcher_core.telemetry import format_bytes
+        self.is_running = True
+        self._open_run_log("dedupe", common_env_vars)
+        env = self._prepare_env(common_env_vars)
+        roots = []
+        for root in [hub_cache_dir(env), env.get("HY3DGEN_MODELS"), RUN_PATH / "extras", Path.home() / ".u2net"]:
+            if root and Path(root).is_dir() and Path(root).resolve() not in [r.resolve() for r in roots]:
+                roots.append(Path(root))
+        self.status_update.emit("正在对模型文件去重...")
+        self.output_received.emit(f"正在查找内容相同的文件: {', '.join(map(str, roots))}")
+        self.output_received.emit(f"存储目录: {MODEL_STORE_PATH}\n")
+        with self.timeline.span("模型文件去重"):
+            store = ContentStore(MODEL_STORE_PATH).dedupe(roots, lambda: self.is_running)
+        if not self.is_running:
+            self.output_received.emit("去重已停止，已计算的哈希会保留供下次使用")
+            return
+        objects, stored_bytes = store.stored()
+        self.output_received.emit(f"已扫描 {store.scanned_files} 个文件 ({format_bytes(store.scanned_bytes)}), 计算哈希 {format_bytes(store.hashed_bytes)}")
+        self.output_received.emit(f"已链接 {store.linked_files} 个重复文件，并删除 {store.pruned_objects} 个不再使用的存储副本")
+        self.output_received.emit(f"释放空间: {format_bytes(store.reclaimed_bytes)}; 存储中共有 {objects} 个唯一文件 ({format_bytes(stored_bytes)})")
+        if store.foreign_files:
+            self.output_received.emit(f"{store.foreign_files} 个文件与存储目录不在同一卷上，保持不变")
+        self.process_finished.emit(0)
         self.is_running = False
 
     def _kill_process_tree(self, pid):
+        import psutil
+
         try:
             parent = psutil.Process(pid)
             children = parent.children(recursive=True)
@@ -425,23 +1315,226 @@ class ProcessWorker(QObject):
             self.output_received.emit(f"--- 终止进程时发生意外错误: {e} ---\n")
             return False
 
-    @Slot()
     def stop_process(self):
-        if self.process and self.is_running:
-            self.is_running = False
-            self.output_received.emit("\n--- 正在尝试终止进程... ---\n")
+        if not self.is_running:
+            return
+        # 没有子进程的启动器工作（如校验模型文件或去重）会根据 is_running 停止
+        self.is_running = False
+        self.output_received.emit("\n--- 正在尝试终止进程... ---\n")
+        if self.scheduler:
+            self.scheduler.cancel()
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        self._stop_replicas()
+        if self.process:
             _pid = self.process.pid
             _success = self._kill_process_tree(_pid)
             if _success:
                 self.output_received.emit(f"--- 进程树 (PID: {_pid}) 已被终止。 ---\n")
             else:
-                self.output_received.emit(f"--- 警告: 无法确认进程是否已被终止。 ---\n")
-            self.process_finished.emit(-1) # 发送一个表示非正常退出的信号
+                self.output_received.emit("--- 警告: 无法确认进程是否已被终止。 ---\n")
+        self.process_finished.emit(-1) # 发送一个表示非正常退出的信号
+
+    def restart_process(self, program_data):
+        """以新参数重新启动运行中的程序，保留已准备好的环境与编译结果；返回是否重启。"""
+        if not (self.can_restart and self.is_running and self.process):
+            return False
+        if program_data['parameters'].get("_enable_texture_gen", False) is True and not self.texture_prepared:
+            self.output_received.emit("\n--- 启用纹理生成需要先完成纹理生成功能设置，请停止后重新启动程序 ---\n")
+            return False
+        if self.switching:
+            self.output_received.emit("\n--- 正在切换到修改后的选项，请在完成后再修改 ---\n")
+            return False
+        if self._zero_downtime(program_data) and self.gateway and not self.idle_stopped:
+            from launcher_core.ports import program_endpoint
+
+            # 新端口需要自己的监听，因此只有内部端口能够无停机切换
+            if program_endpoint(program_data['script'], program_data['parameters']) == (self.gateway.host, self.gateway.port):
+                self.restart_request = program_data
+                self.switching = True
+                self.output_received.emit("\n--- 正在运行中的服务旁启动修改后的选项，就绪前由原服务继续响应 ---\n")
+                self.status_update.emit("正在切换...")
+                return True
+        self.restart_request = program_data
+        self._stop_replicas()
+        self.output_received.emit("\n--- 正在以修改后的选项重启，保留环境与编译结果 ---\n")
+        self.status_update.emit("正在重启...")
+        self._kill_process_tree(self.process.pid)
+        return True
+
 
-# --- 4. UI 界面 ---
+def timeline_summary(timeline):
+    """将启动时间线格式化为各阶段的表格，用于输出面板与控制台。"""
+    return "\n".join([f"\n--- 启动时间线 (共 {timeline.total:.1f} 秒) ---\n      开始      耗时"] + timeline.summary_lines())
+
+
+# --- 4. 无界面模式 ---
+class HeadlessRunner(LaunchRunner):
+    """在前台执行启动步骤，并把全部输出打印到文本流。"""
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream or sys.stdout
+        self.exit_code = None
+        self.output_received = Channel()
+        self.job_output = Channel()
+        self.process_finished = Channel()
+        self.status_update = Channel()
+        self.program_ready = Channel()
+        self.telemetry_started = Channel()
+        self.timeline_recorded = Channel()
+        self.output_received.connect(self._log_output)
+        self.output_received.connect(self._write)
+        self.job_output.connect(self._log_job_output)
+        self.job_output.connect(self._write_job)
+        self.process_finished.connect(self._on_finished)
+        self.timeline_recorded.connect(lambda timeline: self._write(timeline_summary(timeline)))
+
+    def _write(self, text):
+        self.stream.write(text if text.endswith("\n") else text + "\n")
+        self.stream.flush()
+
+    def _write_job(self, tag, text):
+        self._write("".join(f"[{tag}] {line}\n" for line in text.rstrip("\n").split("\n")))
+
+    def _on_finished(self, exit_code):
+        if self.exit_code is None:
+            self.exit_code = exit_code
+        self.finish_run_log(exit_code, wait=True)
+
+
+def program_launch_data(config, program_name):
+    """根据配置生成 program_name 的启动请求，与设置页点击启动时相同。"""
+    program_def = next((p for p in PROGRAMS if p['name'] == program_name and "script" in p), None)
+    if program_def is None:
+        return None
+    return {
+        "program_name": program_name,
+        "script": program_def['script'],
+        "folder": program_def['folder'],
+        "definition": program_def,
+        "parameters": dict(config.get(program_name, {})),
+        "common_env_vars": dict(config.get("global_settings", {})),
+    }
+
+
+def run_headless(argv):
+    """命令行入口：不导入 Qt 启动已配置的程序。"""
+    import signal
+    import argparse
+    import subprocess
+
+    parser = argparse.ArgumentParser(description="不使用图形界面，启动 launcher_config.json 中已配置的程序")
+    parser.add_argument("--headless", action="store_true", help="以无界面模式运行，不导入 PySide6")
+    parser.add_argument("--program", help="launcher_config.json 中的程序名，例如 API-Hunyuan3D-2")
+    parser.add_argument("--prebuild", action="store_true", help="不启动程序，而是预编译所有源码树的材质扩展")
+    parser.add_argument("--dedupe-models", action="store_true", help="不启动程序，而是将 hub 缓存与 extras 中内容相同的模型文件硬链接到同一份存储副本")
+    parser.add_argument("--print-command", action="store_true", help="打印解析后的工作目录与命令后退出")
+    parser.add_argument("--telemetry-csv", help="运行结束时将资源采样写入此 CSV 文件")
+    parser.add_argument("--trace", help="运行结束时将启动时间线以 Chrome trace JSON 格式写入此文件")
+    parser.add_argument("--print-env", action="store_true", help="以 KEY=VALUE 形式打印启动器设置的环境变量后退出")
+    args = parser.parse_args(argv)
+
+    config = ConfigManager(CONFIG_FILE).load_full_config()
+    common_env_vars = config.get("global_settings", {})
+    if args.prebuild:
+        runner = HeadlessRunner()
+        target, target_args = runner.prebuild_all, (common_env_vars,)
+    elif args.dedupe_models:
+        runner = HeadlessRunner()
+        target, target_args = runner.dedupe_models, (common_env_vars,)
+    elif args.program:
+        program_data = program_launch_data(config, args.program)
+        if program_data is None:
+            names = [p['name'] for p in PROGRAMS if "script" in p]
+            parser.error(f"未知程序: {args.program}。可用程序: {', '.join(names)}")
+        if args.print_command or args.print_env:
+            # 保持标准输出可供程序读取；启动器消息输出到标准错误
+            runner = HeadlessRunner(sys.stderr)
+            if args.print_env:
+                env = runner._prepare_env(common_env_vars)
+                for key in sorted(env):
+                    if os.environ.get(key) != env[key]:
+                        print(f"{key}={env[key]}")
+            if args.print_command:
+                from launcher_core.ports import program_endpoint
+
+                endpoint = program_endpoint(program_data['script'], program_data['parameters'])
+                if runner._gateway_enabled(program_data) and endpoint:
+                    # 实际启动时以相同方式改写地址，端口在启动时才选定
+                    host, port = endpoint
+                    runner.output_received.emit(f"启动器自身监听 {host}:{port}，并在 127.0.0.1 上以启动时选定的内部端口启动程序，此处显示为 INTERNAL_PORT")
+                    program_data = runner._backend_data(program_data, 0, ["INTERNAL_PORT"])
+                command = runner.build_command(program_data)
+                print(f"cd {subprocess.list2cmdline([str(RUN_PATH / program_data['folder'])])} && {subprocess.list2cmdline(command)}")
+            return 0
+        runner = HeadlessRunner()
+        target, target_args = runner.run_process, (program_data, common_env_vars)
+    else:
+        parser.error("需要指定 --program、--prebuild 或 --dedupe-models")
+
+    # Ctrl+C 或服务管理器的停止请求会终止子程序的整个进程树
+    def on_signal(signum, frame):
+        runner.stop_process()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    if args.program and hasattr(signal, "SIGHUP"):
+        # kill -HUP 以热重启应用修改后的 launcher_config.json
+        def on_reload(signum, frame):
+            runner.restart_process(program_launch_data(ConfigManager(CONFIG_FILE).load_full_config(), args.program))
+        signal.signal(signal.SIGHUP, on_reload)
+    target(*target_args)
+    if args.telemetry_csv and runner.sampler:
+        runner.sampler.write_csv(args.telemetry_csv)
+    if args.trace and runner.timeline:
+        runner.timeline.write_chrome_trace(args.trace)
+    return runner.exit_code if runner.exit_code is not None else 1
+
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    sys.exit(run_headless(sys.argv[1:]))
+
+# 无界面运行时不能加载 Qt；只有未指定 --headless 时才会执行下面的界面导入
+from PySide6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QStackedWidget, QFormLayout, QComboBox, QPlainTextEdit,
+    QLineEdit, QCheckBox, QTabWidget, QLabel, QScrollBar, QScrollArea, QMessageBox, QFileDialog
+)
+from PySide6.QtCore import QObject, QThread, Signal, Qt, Slot, QEvent, QTimer
+
+
+# --- 5. 后台工作线程 ---
+class ProcessWorker(QObject, LaunchRunner):
+    """在独立线程中执行子进程。"""
+    output_received = Signal(str)
+    job_output = Signal(str, str)
+    process_finished = Signal(int)
+    status_update = Signal(str)
+    program_ready = Signal(float)
+    telemetry_started = Signal(object)
+    timeline_recorded = Signal(object)
+
+    def __init__(self):
+        QObject.__init__(self)
+        LaunchRunner.__init__(self)
+        self.pending = None
+        # 所有发往界面的输出同时由运行日志写入线程持久化
+        self.output_received.connect(self._log_output, Qt.ConnectionType.DirectConnection)
+        self.job_output.connect(self._log_job_output, Qt.ConnectionType.DirectConnection)
+        self.process_finished.connect(self.finish_run_log, Qt.ConnectionType.DirectConnection)
+
+    @Slot()
+    def run_pending(self):
+        """工作线程启动后的入口，见 RunSupervisor.start。"""
+        target, args = self.pending
+        target(*args)
+
+# --- 6. UI 界面 ---
 class SettingsWidget(QWidget):
     """设置界面。"""
     start_requested = Signal(dict)
+    prebuild_requested = Signal(dict)
+    dedupe_requested = Signal(dict)
+    show_runs_requested = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -454,16 +1547,44 @@ class SettingsWidget(QWidget):
 
         self.common_settings_tab = QWidget()
         self.program_settings_tab = QWidget()
-        self.tab_widget.addTab(self.common_settings_tab, "通用设置")
+        common_scroll = QScrollArea()
+        common_scroll.setWidgetResizable(True)
+        common_scroll.setWidget(self.common_settings_tab)
+        self.tab_widget.addTab(common_scroll, "通用设置")
         self.tab_widget.addTab(self.program_settings_tab, "程序参数")
 
         self._create_common_settings_ui()
-        self._create_program_settings_ui()
+        # 参数表单在其标签页首次显示或首次需要其取值时才创建
+        self.program_ui_built = False
+        self.pending_config = None
+        self.tab_widget.currentChanged.connect(self._on_tab_changed)
 
         self.start_button = QPushButton("保存并启动")
         self.start_button.setMinimumHeight(40)
         self.start_button.clicked.connect(self.on_start_clicked)
-        main_layout.addWidget(self.start_button)
+
+        self.prebuild_button = QPushButton("预编译全部纹理扩展")
+        self.prebuild_button.setMinimumHeight(40)
+        self.prebuild_button.setToolTip("并行编译 Hunyuan3D-2、Hunyuan3D-2-vanilla 与 Hunyuan3D-2.1 的纹理生成扩展，不启动程序")
+        self.prebuild_button.clicked.connect(self.on_prebuild_clicked)
+
+        self.dedupe_button = QPushButton("模型文件去重")
+        self.dedupe_button.setMinimumHeight(40)
+        self.dedupe_button.setToolTip("将 HuggingFaceHub、extras 与 ~/.u2net 中内容相同的模型文件替换为指向同一份存储副本的硬链接，并报告释放的空间")
+        self.dedupe_button.clicked.connect(self.on_dedupe_clicked)
+
+        self.runs_button = QPushButton("运行中的程序")
+        self.runs_button.setMinimumHeight(40)
+        self.runs_button.setToolTip("返回查看从本启动器启动的程序的输出")
+        self.runs_button.clicked.connect(self.show_runs_requested)
+        self.runs_button.setVisible(False)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.start_button, 3)
+        button_layout.addWidget(self.prebuild_button, 1)
+        button_layout.addWidget(self.dedupe_button, 1)
+        button_layout.addWidget(self.runs_button, 1)
+        main_layout.addLayout(button_layout)
 
     def _create_common_settings_ui(self):
         layout = QFormLayout(self.common_settings_tab)
@@ -472,7 +1593,11 @@ class SettingsWidget(QWidget):
         common_defs = next((p for p in PROGRAMS if p['name'] == "global_settings"), None)
         if not common_defs: return
         for setting in common_defs["common_env_vars"]:
-            widget = QLineEdit(setting.get('default', ''))
+            if setting.get('type') == "boolean":
+                widget = QCheckBox()
+                widget.setChecked(setting.get('default') is True)
+            else:
+                widget = QLineEdit(setting.get('default', ''))
             self.common_widgets[setting['name']] = widget
             help_label = QLabel(setting.get('help', ''))
             help_label.setWordWrap(True)
@@ -480,6 +1605,19 @@ class SettingsWidget(QWidget):
             layout.addRow(setting['label'], widget)
             layout.addRow(help_label)
 
+    def _on_tab_changed(self, index):
+        if self.tab_widget.widget(index) is self.program_settings_tab:
+            self.ensure_program_ui()
+
+    def ensure_program_ui(self):
+        if self.program_ui_built:
+            return
+        self.program_ui_built = True
+        self._create_program_settings_ui()
+        if self.pending_config is not None:
+            self._apply_program_config(self.pending_config)
+            self.pending_config = None
+
     def _create_program_settings_ui(self):
         layout = QVBoxLayout(self.program_settings_tab)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -565,10 +1703,11 @@ class SettingsWidget(QWidget):
                 self.params_layout.addRow(label, field_container)
 
     def on_start_clicked(self):
+        self.ensure_program_ui()
         selected_program_name = self.program_selector.currentData()
         program_def = next((p for p in PROGRAMS if p['name'] == selected_program_name), None)
         
-        common_env_vars = {name: widget.text() for name, widget in self.common_widgets.items()}
+        common_env_vars = self.collect_common_values()
         
         parameters = {}
         for name, widget in self.param_widgets.items():
@@ -585,12 +1724,25 @@ class SettingsWidget(QWidget):
             "common_env_vars": common_env_vars
         })
 
+    def on_prebuild_clicked(self):
+        self.prebuild_requested.emit(self.collect_common_values())
+
+    def on_dedupe_clicked(self):
+        self.dedupe_requested.emit(self.collect_common_values())
+
     def apply_config(self, config):
         """根据完整的配置数据填充整个UI (通常在启动时调用)。"""
         common_conf = config.get("global_settings", {})
         for name, widget in self.common_widgets.items():
-            widget.setText(str(common_conf.get(name, '')))
+            if isinstance(widget, QCheckBox): widget.setChecked(common_conf.get(name) is True)
+            else: widget.setText(str(common_conf.get(name, '')))
 
+        if self.program_ui_built:
+            self._apply_program_config(config)
+        else:
+            self.pending_config = config
+
+    def _apply_program_config(self, config):
         last_program = config.get("last_selected_program")
         
         self.program_selector.blockSignals(True)
@@ -603,12 +1755,20 @@ class SettingsWidget(QWidget):
         self.on_program_selected()
 
 
+    def collect_common_values(self):
+        values = {}
+        for name, widget in self.common_widgets.items():
+            if isinstance(widget, QCheckBox): values[name] = widget.isChecked()
+            else: values[name] = widget.text()
+        return values
+
     def collect_current_ui_config(self):
         """仅收集当前UI界面上的值。"""
+        self.ensure_program_ui()
         current_program = self.program_selector.currentData()
         config = {
             "last_selected_program": current_program,
-            "global_settings": {name: widget.text() for name, widget in self.common_widgets.items()},
+            "global_settings": self.collect_common_values(),
             current_program: {}
         }
         for name, widget in self.param_widgets.items():
@@ -617,110 +1777,392 @@ class SettingsWidget(QWidget):
             elif isinstance(widget, QComboBox): config[current_program][name] = widget.currentData()
         return config
 
+class ScrollbackView(QWidget):
+    """按需从回滚文件中分页读取，无需将全部历史保留在内存中即可浏览。"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.spill = None
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.text.viewport().installEventFilter(self)
+        self.scrollbar = QScrollBar(Qt.Orientation.Vertical)
+        self.scrollbar.valueChanged.connect(self._load_page)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.text)
+        layout.addWidget(self.scrollbar)
+
+    def set_spill(self, spill):
+        self.spill = spill
+        self.refresh(to_end=True)
+
+    def _page_size(self):
+        return max(1, self.text.viewport().height() // max(1, self.text.fontMetrics().lineSpacing()))
+
+    def refresh(self, to_end=False):
+        total = self.spill.line_count if self.spill else 0
+        page = self._page_size()
+        self.scrollbar.setRange(0, max(0, total - page))
+        self.scrollbar.setPageStep(page)
+        if to_end:
+            self.scrollbar.setValue(self.scrollbar.maximum())
+        self._load_page()
+
+    def _load_page(self, *args):
+        if not self.spill:
+            self.text.clear()
+            return
+        self.text.setPlainText("\n".join(self.spill.read_lines(self.scrollbar.value(), self._page_size())))
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Wheel:
+            self.scrollbar.setValue(self.scrollbar.value() - event.angleDelta().y() // 40)
+            return True
+        return super().eventFilter(obj, event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
 class RunningWidget(QWidget):
     """运行界面。"""
     stop_requested = Signal()
+    restart_requested = Signal()
     back_to_settings_requested = Signal()
+    run_finished = Signal(int)
+    program_ready = Signal(float)
+    status_message = Signal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.is_running = False
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setSpacing(15)
 
+        self.status_label = QLabel("正在启动...")
+        self.status_label.setStyleSheet("color: #888;")
+        layout.addWidget(self.status_label)
+
         self.output_display = QPlainTextEdit("子程序输出将显示在这里...")
         self.output_display.setReadOnly(True)
         self.output_display.setStyleSheet("font-family: Cascadia Mono, Consolas, Courier New, monospace;")
-        layout.addWidget(self.output_display)
+
+        # 实时窗口只保留最新的行；所有输出同时写入磁盘，供“历史”视图查看
+        self.spill = None
+        self.spill_count = 0
+        self.scrollback_view = ScrollbackView()
+        self.scrollback_view.text.setStyleSheet(self.output_display.styleSheet())
+        self.output_stack = QStackedWidget()
+        self.output_stack.addWidget(self.output_display)
+        self.output_stack.addWidget(self.scrollback_view)
+
+        # 每个并行编译任务在主输出旁有独立的标签页
+        self.job_displays = {}
+        self.output_tabs = QTabWidget()
+        self.output_tabs.addTab(self.output_stack, "输出")
+
+        # 程序进程树的资源占用，运行期间持续采样
+        self.sampler = None
+        self.telemetry_label = QLabel()
+        self.telemetry_label.setStyleSheet(self.output_display.styleSheet())
+        self.telemetry_label.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.export_button = QPushButton("导出 CSV")
+        self.export_button.setToolTip("将本次运行记录的资源采样保存为 CSV 文件")
+        self.export_button.clicked.connect(self.export_telemetry)
+        self.telemetry_panel = QWidget()
+        telemetry_layout = QVBoxLayout(self.telemetry_panel)
+        telemetry_layout.setContentsMargins(0, 0, 0, 0)
+        telemetry_layout.addWidget(self.telemetry_label)
+        telemetry_layout.addWidget(self.export_button)
+        telemetry_layout.addStretch()
+        self.telemetry_panel.setVisible(False)
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.refresh_telemetry)
+
+        output_layout = QHBoxLayout()
+        output_layout.addWidget(self.output_tabs, 1)
+        output_layout.addWidget(self.telemetry_panel)
+        layout.addLayout(output_layout)
 
         self.stop_button = QPushButton("停止")
         self.stop_button.setMinimumHeight(40)
         self.stop_button.clicked.connect(self.stop_requested)
+
+        self.restart_button = QPushButton("应用修改并重启")
+        self.restart_button.setMinimumHeight(40)
+        self.restart_button.setToolTip("保存设置，只以修改后的选项重新启动程序，跳过环境准备与编译")
+        self.restart_button.clicked.connect(self.restart_requested)
+        self.restart_button.setVisible(False)
         
         self.back_button = QPushButton("返回设置")
         self.back_button.setMinimumHeight(40)
         self.back_button.clicked.connect(self.back_to_settings_requested)
-        self.back_button.setEnabled(False) 
+
+        self.history_button = QPushButton("历史")
+        self.history_button.setMinimumHeight(40)
+        self.history_button.setCheckable(True)
+        self.history_button.setToolTip("浏览本次运行的完整输出，包括输出窗口中已不再保留的行")
+        self.history_button.toggled.connect(self.show_history)
+
+        self.timeline = None
+        self.trace_button = QPushButton("导出 Trace")
+        self.trace_button.setMinimumHeight(40)
+        self.trace_button.setToolTip("将启动时间线保存为 Chrome trace JSON，可在 chrome://tracing 或 ui.perfetto.dev 中查看")
+        self.trace_button.clicked.connect(self.export_trace)
+        self.trace_button.setVisible(False)
 
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.stop_button)
+        button_layout.addWidget(self.restart_button)
         button_layout.addWidget(self.back_button)
+        button_layout.addWidget(self.history_button)
+        button_layout.addWidget(self.trace_button)
         layout.addLayout(button_layout)
 
-    def append_output(self, text): self.output_display.appendPlainText(text.strip())
-    def clear_output(self): self.output_display.clear()
+    def append_output(self, text):
+        text = text.strip()
+        if self.spill is None:
+            self.spill_count += 1
+            from launcher_core.spill import SpillLog
+            self.spill = SpillLog(SCROLLBACK_PATH / f"output-{os.getpid()}-{self.spill_count}.log")
+        self.spill.append(text.split("\n"))
+        self.output_display.appendPlainText(text)
+
+    def append_job_output(self, tag, text):
+        display = self.job_displays.get(tag)
+        if display is None:
+            display = QPlainTextEdit()
+            display.setReadOnly(True)
+            display.setStyleSheet(self.output_display.styleSheet())
+            display.setMaximumBlockCount(self.output_display.maximumBlockCount())
+            self.job_displays[tag] = display
+            self.output_tabs.addTab(display, tag)
+        display.appendPlainText(text.rstrip())
+
+    def set_max_lines(self, max_lines):
+        self.output_display.setMaximumBlockCount(max(0, max_lines))
+
+    def show_history(self, checked):
+        if checked:
+            self.scrollback_view.set_spill(self.spill)
+            self.output_stack.setCurrentWidget(self.scrollback_view)
+        else:
+            self.output_stack.setCurrentWidget(self.output_display)
+
+    def close_spill(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+        self.scrollback_view.set_spill(None)
+
+    def clear_output(self):
+        self.history_button.setChecked(False)
+        self.close_spill()
+        self.output_display.clear()
+        for display in self.job_displays.values():
+            self.output_tabs.removeTab(self.output_tabs.indexOf(display))
+            display.deleteLater()
+        self.job_displays.clear()
+        self.output_tabs.setCurrentIndex(0)
+
     def set_running_state(self, is_running):
+        self.is_running = is_running
         self.stop_button.setEnabled(is_running)
-        self.back_button.setEnabled(not is_running)
+        self.restart_button.setEnabled(is_running)
+
+    def show_status(self, message):
+        self.status_label.setText(message)
+        self.status_message.emit(message)
+
+    def on_program_ready(self, seconds):
+        self.status_label.setText(f"已就绪：正在接受连接，启动后 {seconds:.1f} 秒")
+        self.status_label.setStyleSheet("color: #2e7d32; font-weight: bold;")
+        self.program_ready.emit(seconds)
+
+    def on_telemetry_started(self, sampler):
+        self.sampler = sampler
+        self.telemetry_panel.setVisible(True)
+        self.telemetry_timer.start(max(250, int(sampler.interval * 1000)))
+
+    def refresh_telemetry(self):
+        from launcher_core.telemetry import sparkline, io_rates, format_bytes
+        samples = self.sampler.samples()
+        if not samples:
+            return
+        last = samples[-1]
+        rates = io_rates(samples)
+        self.telemetry_label.setText("\n".join([
+            f"CPU {last['cpu_percent']:.0f}%", sparkline(s['cpu_percent'] for s in samples), "",
+            f"内存 {format_bytes(last['rss_bytes'])}，峰值 {format_bytes(self.sampler.peak_rss)}", sparkline(s['rss_bytes'] for s in samples), "",
+            f"{last['processes']} 个进程共 {last['threads']} 个线程", sparkline(s['threads'] for s in samples), "",
+            f"磁盘 I/O {format_bytes(rates[-1] if rates else 0)}/s", sparkline(rates),
+        ]))
+
+    def export_telemetry(self):
+        default = str(LOGS_PATH / f"telemetry-{time.strftime('%Y%m%d-%H%M%S')}.csv")
+        path, _ = QFileDialog.getSaveFileName(self, "导出资源采样", default, "CSV 文件 (*.csv)")
+        if path:
+            self.sampler.write_csv(path)
+            self.show_status(f"资源采样已保存到 {path}")
+
+    def on_timeline_recorded(self, timeline):
+        self.timeline = timeline
+        self.append_output(timeline_summary(timeline))
+        self.trace_button.setVisible(True)
+
+    def export_trace(self):
+        default = str(LOGS_PATH / f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        path, _ = QFileDialog.getSaveFileName(self, "导出启动时间线", default, "Chrome trace 文件 (*.json)")
+        if path:
+            self.timeline.write_chrome_trace(path)
+            self.show_status(f"启动时间线已保存到 {path}")
+
+    def on_process_finished(self, exit_code):
+        if self.telemetry_timer.isActive():
+            self.telemetry_timer.stop()
+            self.refresh_telemetry()
+        if not self.is_running:
+            return
+        self.status_label.setStyleSheet("color: #888;")
+        self.append_output(f"\n--- 程序运行结束 (退出码: {exit_code}) ---")
+        self.set_running_state(False)
+        self.show_status("任务完成")
+        self.run_finished.emit(exit_code)
 
-# --- 5. 主窗口 ---
+
+class RunSupervisor(QObject):
+    """每次运行各自拥有一个 ProcessWorker 与 QThread，从而可以同时运行多个程序。"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.runs = {}
+
+    def start(self, run_id, page, endpoint, method, *args):
+        """在新的工作线程上执行 worker.method(*args)，输出显示到 page。"""
+        if run_id in self.runs:
+            self.dispose(run_id)
+        thread = QThread()
+        worker = ProcessWorker()
+        worker.moveToThread(thread)
+        worker.output_received.connect(page.append_output)
+        worker.job_output.connect(page.append_job_output)
+        worker.status_update.connect(page.show_status)
+        worker.process_finished.connect(page.on_process_finished)
+        worker.program_ready.connect(page.on_program_ready)
+        worker.telemetry_started.connect(page.on_telemetry_started)
+        worker.timeline_recorded.connect(page.on_timeline_recorded)
+        # 停止操作不能等待繁忙的工作线程，因此直接在界面线程中执行
+        page.stop_requested.connect(worker.stop_process, Qt.ConnectionType.DirectConnection)
+        worker.pending = (getattr(worker, method), args)
+        thread.started.connect(worker.run_pending)
+        self.runs[run_id] = {"thread": thread, "worker": worker, "endpoint": endpoint, "active": True}
+        thread.start()
+
+    def is_active(self, run_id):
+        return run_id in self.runs and self.runs[run_id]["active"]
+
+    def restart(self, run_id, endpoint, program_data):
+        """以 program_data 热重启 run_id 的程序；与停止一样直接在界面线程中执行。"""
+        run = self.runs[run_id]
+        if run["worker"].restart_process(program_data):
+            run["endpoint"] = endpoint
+            return True
+        return False
+
+    def mark_finished(self, run_id):
+        if run_id in self.runs:
+            self.runs[run_id]["active"] = False
+
+    def active_endpoints(self):
+        return {run_id: run["endpoint"] for run_id, run in self.runs.items() if run["active"]}
+
+    def dispose(self, run_id, wait_ms=2500):
+        run = self.runs.pop(run_id)
+        run["thread"].quit()
+        if not run["thread"].wait(wait_ms):
+            run["thread"].terminate()
+        run["worker"].finish_run_log(-1, wait=True)
+        run["worker"].deleteLater()
+        run["thread"].deleteLater()
+
+    def shutdown(self):
+        for run in self.runs.values():
+            worker = run["worker"]
+            if worker.is_running:
+                worker.is_running = False
+                if worker.scheduler:
+                    worker.scheduler.cancel()
+                if worker.prefetcher:
+                    worker.prefetcher.cancel()
+                try:
+                    worker._stop_replicas()
+                    if worker.process:
+                        worker._kill_process_tree(worker.process.pid)
+                except Exception:
+                    pass
+        for run_id in list(self.runs):
+            self.dispose(run_id)
+
+# --- 7. 主窗口 ---
 class MainWindow(QMainWindow):
     """主窗口。"""
-    request_worker_run = Signal(dict, dict)
-    request_worker_stop = Signal()
-
-    def __init__(self):
+    def __init__(self, startup_check=False):
         super().__init__()
         self.setWindowTitle("混元 3D 2 系列启动器")
         self.setGeometry(100, 100, 900, 700)
 
         self.config_manager = ConfigManager(CONFIG_FILE)
-        self.full_config = self.load_full_config()
+        self.full_config = self.config_manager.load_full_config()
 
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
         self.settings_page = SettingsWidget()
-        self.running_page = RunningWidget()
+        # 每次运行一个标签页；每个 RunningWidget 对应一个从本启动器启动的程序
+        self.run_pages = {}
+        self.run_tabs = QTabWidget()
+        self.run_tabs.setTabsClosable(True)
+        self.run_tabs.tabCloseRequested.connect(self.close_run_tab)
         self.stacked_widget.addWidget(self.settings_page)
-        self.stacked_widget.addWidget(self.running_page)
+        self.stacked_widget.addWidget(self.run_tabs)
 
-        self._setup_worker_thread()
+        self.supervisor = RunSupervisor(self)
 
         self.settings_page.start_requested.connect(self.start_process)
-        self.running_page.back_to_settings_requested.connect(self.show_settings_page)
-        self.running_page.stop_requested.connect(self.request_worker_stop)
+        self.settings_page.prebuild_requested.connect(self.start_prebuild)
+        self.settings_page.dedupe_requested.connect(self.start_dedupe)
+        self.settings_page.show_runs_requested.connect(self.show_running_page)
 
         self.settings_page.apply_config(self.full_config)
 
-    def load_full_config(self):
-        """加载已存配置，并用默认值补全缺失的程序或参数。"""
-        saved_config = self.config_manager.load_config()
-        
-        default_config = {"last_selected_program": ""}
-        for p in PROGRAMS:
-            program_name = p['name']
-            if "common_env_vars" in p:
-                default_config[program_name] = {
-                    setting['name']: setting['default'] for setting in p['common_env_vars']
-                }
-            elif "parameters" in p:
-                default_config[program_name] = {
-                    param['name']: param.get('default') for param in p['parameters']
-                }
-                if not default_config.get("last_selected_program"):
-                    default_config["last_selected_program"] = program_name
-
-        for key, value in saved_config.items():
-            if isinstance(value, dict):
-                if key not in default_config:
-                    default_config[key] = {}
-                default_config[key].update(value)
-            else:
-                default_config[key] = value
-                
-        return default_config
-
-
-    def _setup_worker_thread(self):
-        self.worker_thread = QThread()
-        self.worker = ProcessWorker()
-        self.worker.moveToThread(self.worker_thread)
-        self.worker.output_received.connect(self.running_page.append_output)
-        self.worker.process_finished.connect(self.process_finished)
-        self.worker.status_update.connect(self.statusBar().showMessage)
-        self.request_worker_run.connect(self.worker.run_process)
-        self.request_worker_stop.connect(self.worker.stop_process)
-        self.worker_thread.start()
+        # 启动耗时统计到本窗口任一控件首次绘制为止
+        self.startup_check = startup_check
+        self.startup_ms = None
+        QApplication.instance().installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and isinstance(obj, QWidget) and obj.window() is self:
+            QApplication.instance().removeEventFilter(self)
+            self.startup_ms = elapsed_since_start_ms()
+            self.report_startup_time()
+        return False
+
+    def report_startup_time(self):
+        elapsed, budget = self.startup_ms, startup_budget_ms()
+        if elapsed > budget:
+            message = f"启动耗时 {elapsed:.0f} 毫秒，超出 {budget} 毫秒的启动预算"
+            print(message, file=sys.stderr)
+        else:
+            message = f"启动耗时 {elapsed:.0f} 毫秒"
+        self.statusBar().showMessage(message, 10000)
+        if self.startup_check:
+            # 回归检查：输出测量结果，超出预算或过早导入了运行时模块时以退出码 1 退出
+            eager = eager_imports()
+            print(f"startup_ms={elapsed:.0f} budget_ms={budget} eager_imports={','.join(eager)}")
+            QApplication.instance().exit(1 if elapsed > budget or eager else 0)
 
     def save_settings(self):
         """收集当前UI的值，更新到完整配置中，然后保存。"""
@@ -737,49 +2179,144 @@ class MainWindow(QMainWindow):
         self.config_manager.save_config(self.full_config)
         self.statusBar().showMessage("配置已保存!", 3000)
 
+    def _open_run_page(self, run_id, common_env_vars):
+        """为 run_id 新建输出标签页，替换其上一次运行的标签页。"""
+        page = RunningWidget()
+        page.set_max_lines(number_setting(common_env_vars, "_output_max_lines", 5000))
+        page.set_running_state(True)
+        page.back_to_settings_requested.connect(self.show_settings_page)
+        page.status_message.connect(lambda message: self.statusBar().showMessage(f"{run_id}: {message}"))
+        page.run_finished.connect(lambda exit_code: self.run_finished(run_id, exit_code))
+        page.program_ready.connect(lambda seconds: self._update_tab_state(run_id, "ready"))
+        old_page = self.run_pages.pop(run_id, None)
+        if old_page:
+            index = self.run_tabs.indexOf(old_page)
+            self.run_tabs.removeTab(index)
+            old_page.close_spill()
+            old_page.deleteLater()
+            self.run_tabs.insertTab(index, page, run_id)
+        else:
+            self.run_tabs.addTab(page, run_id)
+        self.run_pages[run_id] = page
+        self._update_tab_state(run_id, "running")
+        self.settings_page.runs_button.setVisible(True)
+        self.show_running_page(run_id)
+        return page
+
+    def _update_tab_state(self, run_id, state):
+        index = self.run_tabs.indexOf(self.run_pages[run_id])
+        prefix = {"running": "● ", "ready": "✔ "}.get(state, "")
+        self.run_tabs.setTabText(index, f"{prefix}{run_id}")
+
+    def find_port_conflict(self, data):
+        """返回程序端口不可用的原因说明；端口空闲时返回 None。"""
+        from launcher_core.ports import program_endpoint, port_available
+
+        endpoint = program_endpoint(data['script'], data['parameters'])
+        if not endpoint:
+            return None
+        host, port = endpoint
+        for other_id, other_endpoint in self.supervisor.active_endpoints().items():
+            if other_endpoint and other_endpoint[1] == port:
+                return f"端口 {port} 已被本启动器中正在运行的 {other_id} 占用。请先停止它，或更换 --port。"
+        if not port_available(host, port):
+            return f"{host} 上的端口 {port} 已被其他进程占用。请释放该端口，或更换 --port。"
+        return None
+
     def start_process(self, data):
+        from launcher_core.ports import program_endpoint
+
         self.save_settings()
-        self.running_page.clear_output()
-        self.stacked_widget.setCurrentWidget(self.running_page)
-        self.running_page.set_running_state(True)
+        run_id = data['program_name']
+        if self.supervisor.is_active(run_id):
+            self.show_running_page(run_id)
+            self.statusBar().showMessage(f"{run_id} 已在运行", 5000)
+            return
+        conflict = self.find_port_conflict(data)
+        if conflict:
+            QMessageBox.warning(self, "端口冲突", conflict)
+            return
+        endpoint = program_endpoint(data['script'], data['parameters'])
+        page = self._open_run_page(run_id, data['common_env_vars'])
+        page.restart_button.setVisible(True)
+        page.restart_requested.connect(lambda: self.restart_process(run_id))
         self.statusBar().showMessage("正在准备启动...")
-        self.request_worker_run.emit(data, data['common_env_vars'])
+        self.supervisor.start(run_id, page, endpoint, "run_process", data, data['common_env_vars'])
+
+    def restart_process(self, run_id):
+        """保存设置，并通过热重启将 run_id 的设置应用到运行中的程序。"""
+        from launcher_core.ports import program_endpoint
+
+        if not self.supervisor.is_active(run_id):
+            return
+        self.save_settings()
+        data = program_launch_data(self.full_config, run_id)
+        endpoint = program_endpoint(data['script'], data['parameters'])
+        if endpoint != self.supervisor.runs[run_id]["endpoint"]:
+            conflict = self.find_port_conflict(data)
+            if conflict:
+                QMessageBox.warning(self, "端口冲突", conflict)
+                return
+        if self.supervisor.restart(run_id, endpoint, data):
+            self._update_tab_state(run_id, "running")
 
-    def process_finished(self, exit_code):
-        self.running_page.append_output(f"\n--- 程序执行结束 (退出码: {exit_code}) ---")
-        self.running_page.set_running_state(False)
-        self.statusBar().showMessage("任务完成", 5000)
+    def start_prebuild(self, common_env_vars):
+        self._start_task("prebuild", "prebuild_all", common_env_vars, "正在准备预编译...")
+
+    def start_dedupe(self, common_env_vars):
+        self._start_task("dedupe", "dedupe_models", common_env_vars, "正在准备模型文件去重...")
+
+    def _start_task(self, run_id, method, common_env_vars, message):
+        """在单独的标签页中运行工作线程的维护任务，如同一个没有端口的程序。"""
+        self.save_settings()
+        if self.supervisor.is_active(run_id):
+            self.show_running_page(run_id)
+            self.statusBar().showMessage(f"{run_id} 已在运行", 5000)
+            return
+        page = self._open_run_page(run_id, common_env_vars)
+        self.statusBar().showMessage(message)
+        self.supervisor.start(run_id, page, None, method, common_env_vars)
+
+    def run_finished(self, run_id, exit_code):
+        self.supervisor.mark_finished(run_id)
+        if run_id in self.run_pages:
+            self._update_tab_state(run_id, "finished")
+
+    def close_run_tab(self, index):
+        page = self.run_tabs.widget(index)
+        run_id = next(name for name, p in self.run_pages.items() if p is page)
+        if self.supervisor.is_active(run_id):
+            self.statusBar().showMessage(f"请先停止 {run_id} 再关闭其标签页", 5000)
+            return
+        self.supervisor.dispose(run_id)
+        self.run_tabs.removeTab(index)
+        page.close_spill()
+        page.deleteLater()
+        del self.run_pages[run_id]
+        if not self.run_pages:
+            self.settings_page.runs_button.setVisible(False)
+            self.show_settings_page()
 
     def show_settings_page(self):
         self.stacked_widget.setCurrentWidget(self.settings_page)
 
-    def closeEvent(self, event):
-        # 确保在关闭窗口前，先尝试停止正在运行的子进程
-        if self.worker.is_running:
-            self.statusBar().showMessage("Closing... Stopping background processes...")
-            self.worker.is_running = False
-            try:
-                if self.worker.process:
-                    self.worker._kill_process_tree(self.worker.process.pid)
-            except Exception:
-                # 回退：发出信号并短暂等待 worker 结束
-                self.request_worker_stop.emit()
-                import time
-                for _ in range(50):
-                    if not self.worker.is_running:
-                        break
-                    time.sleep(0.05)
+    def show_running_page(self, run_id=None):
+        if run_id in self.run_pages:
+            self.run_tabs.setCurrentWidget(self.run_pages[run_id])
+        self.stacked_widget.setCurrentWidget(self.run_tabs)
 
-        # 现在请求已发送（或已直接停止），退出并等待线程
-        self.worker_thread.quit()
-        self.worker_thread.wait(2500) # 最多等待2.5秒
-        if self.worker_thread.isRunning():
-            self.worker_thread.terminate()
+    def closeEvent(self, event):
+        # 确保在关闭窗口前停止所有正在运行的子进程
+        if self.supervisor.active_endpoints():
+            self.statusBar().showMessage("正在关闭... 正在停止后台进程...")
+        self.supervisor.shutdown()
+        for page in self.run_pages.values():
+            page.close_spill()
         event.accept()
 
-# --- 6. 程序入口 ---
+# --- 8. 程序入口 ---
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(startup_check="--startup-check" in sys.argv[1:])
     window.show()
     sys.exit(app.exec())
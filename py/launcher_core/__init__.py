@@ -0,0 +1 @@
+"""Language-neutral helpers shared by launcher.en.py and launcher.zh.py."""
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Content-hash cache for the texture-generation native extensions."""
+import sys
+import os
+import json
+import time
+import shutil
+import hashlib
+import sysconfig
+from pathlib import Path
+from importlib import metadata
+
+# Build products and artefacts of previous builds must not feed into the source hash,
+# otherwise copying the .pyd next to the sources would invalidate the cache every time.
+IGNORED_DIRS = {"build", "dist", "__pycache__", ".git"}
+IGNORED_SUFFIXES = {".pyd", ".so", ".dll", ".lib", ".exp", ".obj", ".o", ".pyc"}
+
+# Environment variables that change the generated binaries
+TOOLCHAIN_ENV_VARS = ["CUDA_HOME", "CUDA_PATH", "TORCH_CUDA_ARCH_LIST", "DISTUTILS_USE_SDK", "VCToolsVersion", "CC", "CXX"]
+TOOLCHAIN_EXES = ["nvcc", "cl", "gcc", "g++"]
+
+
+def source_tree_hash(root):
+    """Hash relative paths and contents of all source files below root."""
+    root = Path(root)
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS and not d.endswith(".egg-info"))
+        for filename in sorted(filenames):
+            if Path(filename).suffix.lower() in IGNORED_SUFFIXES:
+                continue
+            path = Path(dirpath) / filename
+            digest.update(path.relative_to(root).as_posix().encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def abi_tag():
+    """Python ABI and platform tag the extension is compiled for, e.g. cpython-312-win-amd64."""
+    return f"{sys.implementation.cache_tag}-{sysconfig.get_platform()}"
+
+
+def _dist_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def installed_identity(name):
+    """Version, origin and file list hash of the installed distribution name; "" if it is not installed."""
+    try:
+        dist = metadata.distribution(name)
+    except metadata.PackageNotFoundError:
+        return ""
+    # Builds of the same version from different source trees differ in where they came from and in their files
+    digest = hashlib.sha256()
+    for part in ("direct_url.json", "RECORD"):
+        digest.update((dist.read_text(part) or "").encode("utf-8") + b"\0")
+    return f"{dist.version}:{digest.hexdigest()[:16]}"
+
+
+def toolchain_fingerprint(env):
+    """Cheap fingerprint of compilers and torch; no compiler is executed."""
+    parts = [f"torch={_dist_version('torch')}"]
+    for var in TOOLCHAIN_ENV_VARS:
+        parts.append(f"{var}={env.get(var, '')}")
+    search_path = env.get("PATH", os.defpath)
+    for exe in TOOLCHAIN_EXES:
+        found = shutil.which(exe, path=search_path)
+        if found:
+            stat = os.stat(found)
+            parts.append(f"{exe}={found}:{stat.st_size}:{int(stat.st_mtime)}")
+        else:
+            parts.append(f"{exe}=")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """Remembers which source tree state was last built successfully, stored as JSON."""
+    def __init__(self, filename):
+        self.filename = Path(filename)
+        self.entries = self._load()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _load(self):
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.filename.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(tmp, self.filename)
+
+    def make_key(self, pkg_dir, env):
+        return {
+            "source": source_tree_hash(pkg_dir),
+            "abi": abi_tag(),
+            "toolchain": toolchain_fingerprint(env),
+        }
+
+    def lookup(self, pkg_dir, key, outputs=(), installed=""):
+        """Return the cached entry if the key matches, all outputs still exist and the same build is installed, else None.
+
+        installed is the installed_identity() of the package now; another source tree that
+        installs a package of the same name replaces it in site-packages.
+        """
+        entry = self.entries.get(str(Path(pkg_dir).resolve()))
+        if (entry and entry.get("key") == key and entry.get("installed", "") == installed
+                and all(Path(p).exists() for p in outputs)):
+            self.hits += 1
+            self.saved_seconds += entry.get("build_seconds", 0.0)
+            return entry
+        self.misses += 1
+        return None
+
+    def record(self, pkg_dir, key, build_seconds, installed=""):
+        self.entries[str(Path(pkg_dir).resolve())] = {
+            "key": key,
+            "installed": installed,
+            "build_seconds": round(build_seconds, 1),
+            "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        try:
+            self._save()
+        except OSError:
+            pass
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Routes extension compilation through sccache or ccache with a cache directory in the portable root."""
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+# Preferred first: sccache also handles MSVC and nvcc, ccache mainly gcc/clang
+CACHE_TOOLS = ["sccache", "ccache"]
+
+
+class CompilerCache:
+    """A compiler cache executable plus the environment that makes builds use it."""
+    def __init__(self, exe, cache_dir):
+        self.exe = exe
+        self.kind = "sccache" if "sccache" in os.path.basename(exe).lower() else "ccache"
+        self.cache_dir = str(cache_dir)
+
+    @classmethod
+    def detect(cls, env, cache_dir):
+        """Return a CompilerCache for the first tool found on env's PATH, or None."""
+        search_path = env.get("PATH", os.defpath)
+        for tool in CACHE_TOOLS:
+            exe = shutil.which(tool, path=search_path)
+            if exe:
+                return cls(exe, cache_dir)
+        return None
+
+    def _cache_env(self, env):
+        env = dict(env)
+        if self.kind == "sccache":
+            env["SCCACHE_DIR"] = self.cache_dir
+        else:
+            env["CCACHE_DIR"] = self.cache_dir
+            # Hash paths relative to the portable root, so a moved or copied installation still hits
+            env["CCACHE_BASEDIR"] = str(os.path.dirname(self.cache_dir))
+        return env
+
+    def apply(self, env):
+        """Return a copy of env whose CUDA and C/C++ compilations go through the cache."""
+        env = self._cache_env(env)
+        # torch.utils.cpp_extension runs $PYTORCH_NVCC instead of nvcc when it is set
+        env["PYTORCH_NVCC"] = f'"{self.exe}" nvcc' if " " in self.exe else f"{self.exe} nvcc"
+        if sys.platform != 'win32':
+            # setuptools' MSVC compiler has no launcher hook, so on Windows only nvcc is wrapped
+            env["CC"] = f"{self.exe} {env.get('CC', 'cc')}"
+            env["CXX"] = f"{self.exe} {env.get('CXX', 'c++')}"
+        return env
+
+    def stats(self, env):
+        """Return cumulative (hits, misses) of the cache, or None if they cannot be read."""
+        try:
+            if self.kind == "sccache":
+                out = subprocess.run([self.exe, "--show-stats", "--stats-format", "json"], env=self._cache_env(env),
+                                     capture_output=True, text=True, timeout=30).stdout
+                stats = json.loads(out)["stats"]
+                return (sum(stats["cache_hits"]["counts"].values()),
+                        sum(stats["cache_misses"]["counts"].values()))
+            out = subprocess.run([self.exe, "--print-stats"], env=self._cache_env(env),
+                                 capture_output=True, text=True, timeout=30).stdout
+            values = dict(line.split("\t", 1) for line in out.splitlines() if "\t" in line)
+            hits = int(values.get("direct_cache_hit", 0)) + int(values.get("preprocessed_cache_hit", 0))
+            return hits, int(values.get("cache_miss", 0))
+        except (OSError, ValueError, KeyError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""Signal-like callback lists for running the launch steps without Qt."""
+
+
+class Channel:
+    """Minimal stand-in for a Qt signal: slots are called synchronously on emit."""
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self._slots:
+            slot(*args)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed store that deduplicates identical model files with hardlinks."""
+import os
+import json
+import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from launcher_core.hfcache import _file_sha256
+
+# Small files are not worth a hash and a directory entry
+MIN_SIZE = 1 << 20
+
+
+class ContentStore:
+    """Keeps one copy of each file content as root/<sha256[:2]>/<sha256>.
+
+    Scanned files become hardlinks to the stored copy, so identical weights in the hub
+    cache, the code trees and extras occupy the disk once. Hardlinks only work within one
+    volume; files on other volumes are counted and left alone. Digests are remembered by
+    path, size and modification time in root/index.json, so files are hashed once.
+    """
+    def __init__(self, root, max_workers=None):
+        self.root = Path(root)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.index_file = self.root / "index.json"
+        self.scanned_files = 0
+        self.scanned_bytes = 0
+        self.hashed_bytes = 0
+        self.linked_files = 0
+        self.reclaimed_bytes = 0
+        self.foreign_files = 0
+        self.pruned_objects = 0
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def object_path(self, digest):
+        return self.root / digest[:2] / digest
+
+    def _candidates(self, roots, should_continue):
+        seen = set()
+        for root in roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                if not should_continue():
+                    return
+                if Path(dirpath).resolve() == self.root.resolve():
+                    dirnames[:] = []
+                    continue
+                for name in filenames:
+                    path = Path(dirpath) / name
+                    # Hub snapshots link to blobs, which are scanned themselves; partial downloads are still changing
+                    if path.is_symlink() or name.endswith((".incomplete", ".lock", ".dedup")):
+                        continue
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    if stat.st_size >= MIN_SIZE and str(path) not in seen:
+                        seen.add(str(path))
+                        yield path, stat
+
+    def dedupe(self, roots, should_continue=lambda: True):
+        """Link every duplicate below roots to the store and drop stored copies nothing links to any more.
+
+        Once should_continue() turns false it stops early, keeping the digests found so far.
+        """
+        files = list(self._candidates(roots, should_continue))
+        self.scanned_files = len(files)
+        self.scanned_bytes = sum(stat.st_size for _, stat in files)
+        pending = [(path, stat) for path, stat in files
+                   if self._index.get(str(path), [None, None])[:2] != [stat.st_size, stat.st_mtime_ns]]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dedup") as pool:
+            for (path, stat), digest in zip(pending, pool.map(lambda item: _file_sha256(item[0], should_continue), pending)):
+                if digest:
+                    self.hashed_bytes += stat.st_size
+                    self._index[str(path)] = [stat.st_size, stat.st_mtime_ns, digest]
+        index = {}
+        for path, stat in files:
+            if not should_continue():
+                # Nothing is pruned; the next run picks up from the known digests
+                self._index.update(index)
+                break
+            entry = self._index.get(str(path))
+            if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+                self._link(path, stat, entry[2])
+                try:
+                    linked = path.stat()
+                    index[str(path)] = [linked.st_size, linked.st_mtime_ns, entry[2]]
+                except OSError:
+                    pass
+        else:
+            self._index = index
+            self._prune()
+        self._save()
+        return self
+
+    def _link(self, path, stat, digest):
+        obj = self.object_path(digest)
+        try:
+            stored = obj.stat()
+        except FileNotFoundError:
+            # The first copy seen becomes the stored one, without copying any data
+            try:
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                os.link(path, obj)
+            except OSError:
+                self.foreign_files += 1
+            return
+        if (stored.st_dev, stored.st_ino) == (stat.st_dev, stat.st_ino):
+            return
+        if stored.st_dev != stat.st_dev:
+            self.foreign_files += 1
+            return
+        tmp = path.with_name(path.name + ".dedup")
+        try:
+            os.link(obj, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self.linked_files += 1
+        # The data is only freed when that was its last name
+        if stat.st_nlink == 1:
+            self.reclaimed_bytes += stat.st_size
+
+    def _prune(self):
+        if not self.root.is_dir():
+            return
+        for prefix in self.root.iterdir():
+            if not prefix.is_dir():
+                continue
+            for obj in prefix.iterdir():
+                try:
+                    stat = obj.stat()
+                    if stat.st_nlink == 1:
+                        obj.unlink()
+                        self.pruned_objects += 1
+                        self.reclaimed_bytes += stat.st_size
+                except OSError:
+                    pass
+
+    def stored(self):
+        """Number and total size of the stored objects."""
+        count = size = 0
+        if self.root.is_dir():
+            for prefix in self.root.iterdir():
+                if prefix.is_dir():
+                    for obj in prefix.iterdir():
+                        count += 1
+                        size += obj.stat().st_size
+        return count, size
+
+    def _save(self):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_file.with_name(self.index_file.name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            tmp.replace(self.index_file)
+        except OSError:
+            pass
+
+
+def link_or_copy(src, dst):
+    """Make dst a hardlink of src, or a copy when they are on different volumes; returns whether it linked."""
+    dst = Path(dst)
+    tmp = dst.with_name(dst.name + ".dedup")
+    try:
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        shutil.copy(src, dst)
+        return False
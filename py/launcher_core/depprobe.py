@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""In-process checks of the installed distributions, so pip is only spawned for real gaps.
+
+The launcher runs on the same interpreter it starts the programs with, so importlib.metadata
+sees exactly the packages the programs will import.
+"""
+import re
+import json
+import importlib
+import importlib.metadata
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:
+    # Every interpreter the launcher installs into has pip, which vendors packaging
+    from pip._vendor.packaging.requirements import Requirement, InvalidRequirement
+
+
+def normalize_name(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def installed_distributions():
+    """Map of normalized distribution name to installed version."""
+    # pip runs in a child process, so the import system's directory caches may be stale
+    importlib.invalidate_caches()
+    dists = {}
+    for dist in importlib.metadata.distributions():
+        name = dist.metadata["Name"]
+        if name:
+            dists.setdefault(normalize_name(name), dist.version)
+    return dists
+
+
+def _extra_dependencies(name, extra):
+    """Names of the dependencies that extra adds on this platform."""
+    try:
+        requires = importlib.metadata.requires(name) or []
+    except importlib.metadata.PackageNotFoundError:
+        return []
+    names = []
+    for entry in requires:
+        try:
+            requirement = Requirement(entry)
+        except InvalidRequirement:
+            continue
+        # Only dependencies of the extra count, and of those only the ones whose platform markers hold here
+        if (requirement.marker and requirement.marker.evaluate({"extra": extra})
+                and not requirement.marker.evaluate({"extra": ""})):
+            names.append(requirement.name)
+    return names
+
+
+def unmet_requirement(requirement, installed=None):
+    """Describe why requirement is not satisfied, or return None if it is.
+
+    Understands "name", "name==version" and "name[extra,...]" forms, optionally followed by
+    an environment marker; a requirement whose marker does not hold on this platform is
+    satisfied. Returns a tuple of (name, installed version or None, required version or None).
+    """
+    try:
+        parsed = Requirement(requirement)
+    except InvalidRequirement as e:
+        raise ValueError(f"Unsupported requirement: {requirement}") from e
+    pins = [spec.version for spec in parsed.specifier if spec.operator == "=="]
+    if len(pins) != len(parsed.specifier) or len(pins) > 1 or parsed.url:
+        raise ValueError(f"Unsupported requirement: {requirement}")
+    if parsed.marker and not parsed.marker.evaluate({"extra": ""}):
+        return None
+    name, version = parsed.name, pins[0] if pins else None
+    installed = installed_distributions() if installed is None else installed
+    current = installed.get(normalize_name(name))
+    if current is None or (version and current != version):
+        return name, current, version
+    for extra in sorted(parsed.extras):
+        for dependency in _extra_dependencies(name, extra):
+            if normalize_name(dependency) not in installed:
+                return f"{name}[{extra}]", current, version
+    return None
+
+
+def load_snapshot(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(path, dists):
+    """Write dists like a lock file, so the next launch can tell what changed in between."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(dists.items())), f, indent=1)
+        tmp.replace(path)
+    except OSError:
+        pass
+
+
+def snapshot_drift(old, new):
+    """List of (name, old version or None, new version or None) for every distribution that changed."""
+    if old is None:
+        return []
+    return [(name, old.get(name), new.get(name))
+            for name in sorted(set(old) | set(new)) if old.get(name) != new.get(name)]
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""Checks of model repositories in the HuggingFace hub cache, without importing huggingface_hub."""
+import os
+import re
+import json
+import time
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# LFS blobs are named after the sha256 of their content; small files after their git blob id
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_COMMIT = re.compile(r"^[0-9a-f]{40}$")
+
+
+def hub_cache_dir(env):
+    """The hub cache the child will use, resolved from its environment like huggingface_hub does."""
+    if env.get("HF_HUB_CACHE"):
+        return Path(env["HF_HUB_CACHE"])
+    if env.get("HF_HOME"):
+        return Path(env["HF_HOME"]) / "hub"
+    return Path(env.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "huggingface" / "hub"
+
+
+def repo_folder(cache_dir, repo_id):
+    return Path(cache_dir) / ("models--" + repo_id.replace("/", "--"))
+
+
+class ModelRequirement:
+    """A model repository, optionally only one subfolder of it, that a program loads at startup."""
+    def __init__(self, repo_id, subfolder=None, revision="main"):
+        self.repo_id = repo_id
+        self.subfolder = subfolder or None
+        self.revision = revision
+
+    @property
+    def pattern(self):
+        return f"{self.subfolder}/*" if self.subfolder else None
+
+    def __str__(self):
+        return f"{self.repo_id}/{self.subfolder}" if self.subfolder else self.repo_id
+
+    def __eq__(self, other):
+        return isinstance(other, ModelRequirement) and str(self) == str(other) and self.revision == other.revision
+
+    def __hash__(self):
+        return hash((str(self), self.revision))
+
+
+def snapshot_dir(cache_dir, repo_id, revision="main"):
+    """The snapshot directory revision points to, or None if the repository has not been downloaded."""
+    folder = repo_folder(cache_dir, repo_id)
+    try:
+        commit = (folder / "refs" / revision).read_text(encoding="utf-8").strip()
+    except OSError:
+        commit = revision if _COMMIT.match(revision) else None
+    if not commit:
+        return None
+    path = folder / "snapshots" / commit
+    return path if path.is_dir() else None
+
+
+def snapshot_files(cache_dir, requirement):
+    """Files of the requirement in the cache, or None if they are missing or still being downloaded."""
+    snapshot = snapshot_dir(cache_dir, requirement.repo_id, requirement.revision)
+    if snapshot is None:
+        return None
+    root = snapshot / requirement.subfolder if requirement.subfolder else snapshot
+    # An interrupted download leaves .incomplete blobs behind
+    if any((repo_folder(cache_dir, requirement.repo_id) / "blobs").glob("*.incomplete")):
+        return None
+    files = [Path(dirpath) / name for dirpath, _, names in os.walk(root) for name in names]
+    return files or None
+
+
+class BlobVerifier:
+    """Verifies cache files against the sha256 their blob is named after, hashing in parallel.
+
+    Verified blobs are remembered by path, size and modification time in a JSON file, so
+    each one is hashed only once. Files that are not symlinks to a sha256-named blob, as
+    in caches on Windows without symlink support, can only be checked for existence.
+    Once should_continue() turns false, files not hashed yet are reported as neither good
+    nor bad.
+    """
+    def __init__(self, state_file, max_workers=None, should_continue=lambda: True):
+        self.state_file = Path(state_file)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.should_continue = should_continue
+        self.hashed_files = 0
+        self.hashed_bytes = 0
+        self.seconds = 0.0
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self._verified = json.load(f)
+        except (OSError, ValueError):
+            self._verified = {}
+
+    def bad_files(self, files):
+        """Return the files whose blob is missing or does not match its sha256."""
+        bad = []
+        pending = []
+        for path in files:
+            target = os.path.realpath(path)
+            try:
+                stat = os.stat(target)
+            except OSError:
+                bad.append(path)
+                continue
+            digest = os.path.basename(target)
+            if not _SHA256.match(digest) or self._verified.get(target) == [stat.st_size, stat.st_mtime_ns]:
+                continue
+            pending.append((path, target, digest, stat))
+        if pending:
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="verify") as pool:
+                digests = list(pool.map(lambda item: _file_sha256(item[1], self.should_continue), pending))
+            self.seconds += time.monotonic() - start
+            for (path, target, digest, stat), actual in zip(pending, digests):
+                if actual == "":
+                    continue
+                ok = actual == digest
+                self.hashed_files += 1
+                self.hashed_bytes += stat.st_size
+                if ok:
+                    self._verified[target] = [stat.st_size, stat.st_mtime_ns]
+                else:
+                    bad.append(path)
+            self._save()
+        return bad
+
+    def _save(self):
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._verified, f)
+            tmp.replace(self.state_file)
+        except OSError:
+            pass
+
+
+def _file_sha256(path, should_continue=lambda: True):
+    """Hex sha256 of the file; None if it cannot be read, "" if should_continue() turned false first."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            # hashlib releases the GIL on large updates, so the pool threads hash in parallel
+            for chunk in iter(lambda: f.read(8 << 20), b""):
+                if not should_continue():
+                    return ""
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def check_models(cache_dir, requirements, verifier, local_root=None):
+    """Return (requirement, problem, files) per requirement; problem is None, "missing" or "corrupt".
+
+    files are the cached files of a complete requirement and the failing ones of a corrupt one.
+    With local_root, a plain <local_root>/<repo>/<subfolder> directory also counts as complete,
+    as hy3dgen looks there before it falls back to the hub cache.
+    """
+    results = []
+    for requirement in requirements:
+        if local_root:
+            local = Path(local_root) / requirement.repo_id / (requirement.subfolder or "")
+            if local.is_dir() and any(local.iterdir()):
+                results.append((requirement, None, []))
+                continue
+        files = snapshot_files(cache_dir, requirement)
+        if files is None:
+            results.append((requirement, "missing", []))
+            continue
+        bad = verifier.bad_files(files)
+        results.append((requirement, "corrupt", bad) if bad else (requirement, None, files))
+    return results
+
+
+def discard_files(files):
+    """Delete the blobs behind files, so the next download fetches them again."""
+    for path in files:
+        for target in {os.path.realpath(path), str(path)}:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+
+def file_patterns(cache_dir, requirement, files):
+    """allow_patterns that match exactly files of the requirement's snapshot, e.g. the discarded ones."""
+    snapshot = snapshot_dir(cache_dir, requirement.repo_id, requirement.revision)
+    # The patterns are fnmatch patterns, so wildcards in file names are matched literally
+    return [re.sub(r"([*?[])", r"[\1]", Path(path).relative_to(snapshot).as_posix()) for path in files]
+
+
+def download_command(python, requirement, patterns=None):
+    """Command that downloads the requirement, or only the files matching patterns, into the hub cache configured in the environment."""
+    script = ("import sys; from huggingface_hub import snapshot_download; "
+              "snapshot_download(sys.argv[1], revision=sys.argv[2], allow_patterns=sys.argv[3:] or None)")
+    patterns = patterns or ([requirement.pattern] if requirement.pattern else [])
+    return [python, "-s", "-c", script, requirement.repo_id, requirement.revision] + patterns
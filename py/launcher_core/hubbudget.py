@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Size budget for the HuggingFace hub cache with least-recently-used eviction of revisions."""
+import os
+import json
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+from launcher_core.hfcache import repo_folder, snapshot_dir
+
+
+def revision_key(repo_id, commit):
+    return f"{repo_id}@{commit}"
+
+
+class UsageLog:
+    """Last launch that used each repository revision, stored as JSON {"repo@commit": unix time}."""
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.last_used = json.load(f)
+        except (OSError, ValueError):
+            self.last_used = {}
+
+    def touch(self, cache_dir, requirements, now=None):
+        """Mark the revisions the requirements currently resolve to as used now."""
+        now = now or time.time()
+        for requirement in requirements:
+            snapshot = snapshot_dir(cache_dir, requirement.repo_id, requirement.revision)
+            if snapshot is not None:
+                self.last_used[revision_key(requirement.repo_id, snapshot.name)] = now
+        self.save()
+
+    def save(self):
+        tmp = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Concurrent launcher runs save too, so each writes its own temporary file
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.path.parent, prefix=self.path.name,
+                                             suffix=".tmp", delete=False) as f:
+                tmp = Path(f.name)
+                json.dump(self.last_used, f, indent=1)
+            tmp.replace(self.path)
+        except OSError:
+            if tmp is not None:
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+
+
+def cache_revisions(cache_dir):
+    """Map of (repo_id, commit) to the set of real files its snapshot consists of."""
+    revisions = {}
+    for repo_dir in Path(cache_dir).glob("models--*"):
+        repo_id = "/".join(repo_dir.name.split("--")[1:])
+        snapshots = repo_dir / "snapshots"
+        if not snapshots.is_dir():
+            continue
+        for snapshot in snapshots.iterdir():
+            files = set()
+            for dirpath, _, names in os.walk(snapshot):
+                for name in names:
+                    files.add(os.path.realpath(os.path.join(dirpath, name)))
+            revisions[(repo_id, snapshot.name)] = files
+    return revisions
+
+
+def _file_size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def enforce_budget(cache_dir, budget_bytes, protected, last_used):
+    """Delete least recently used revisions until the cache fits budget_bytes.
+
+    protected(repo_id, commit) returns True for revisions that must stay. Blobs shared
+    with a remaining revision are kept. Returns (evicted, total) where evicted lists
+    (repo_id, commit, freed bytes) and total is the cache size afterwards.
+    """
+    revisions = cache_revisions(cache_dir)
+    sizes = {}
+    for files in revisions.values():
+        for path in files:
+            if path not in sizes:
+                sizes[path] = _file_size(path)
+    total = sum(sizes.values())
+
+    def last_use(item):
+        (repo_id, commit), _ = item
+        used = last_used.get(revision_key(repo_id, commit))
+        if used is None:
+            # Never seen by the launcher: fall back to when it was downloaded
+            try:
+                used = (repo_folder(cache_dir, repo_id) / "snapshots" / commit).stat().st_mtime
+            except OSError:
+                used = 0
+        return used
+
+    candidates = sorted(((key, files) for key, files in revisions.items() if not protected(*key)), key=last_use)
+    evicted = []
+    for (repo_id, commit), files in candidates:
+        if total <= budget_bytes:
+            break
+        del revisions[(repo_id, commit)]
+        still_used = set().union(*revisions.values()) if revisions else set()
+        freed = [path for path in files if path not in still_used]
+        _delete_revision(cache_dir, repo_id, commit, freed)
+        freed_bytes = sum(sizes.get(path, 0) for path in freed)
+        total -= freed_bytes
+        evicted.append((repo_id, commit, freed_bytes))
+    return evicted, total
+
+
+def _delete_revision(cache_dir, repo_id, commit, freed):
+    repo_dir = repo_folder(cache_dir, repo_id)
+    # Snapshot entries are symlinks into blobs, so removing the tree never follows them
+    shutil.rmtree(repo_dir / "snapshots" / commit, ignore_errors=True)
+    for path in freed:
+        if not Path(path).is_relative_to(repo_dir.resolve()):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    refs = repo_dir / "refs"
+    if refs.is_dir():
+        for ref in refs.rglob("*"):
+            try:
+                if ref.is_file() and ref.read_text(encoding="utf-8").strip() == commit:
+                    ref.unlink()
+            except OSError:
+                pass
+    # The last revision takes the repository with it, unless a download into it is under way
+    snapshots = repo_dir / "snapshots"
+    if (not snapshots.is_dir() or not any(snapshots.iterdir())) and not any((repo_dir / "blobs").glob("*.incomplete")):
+        shutil.rmtree(repo_dir, ignore_errors=True)
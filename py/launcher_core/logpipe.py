@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Drains a child's output pipe without ever blocking it and hands lines over in batches."""
+import time
+import threading
+
+FLUSH_INTERVAL = 0.05  # seconds
+MAX_BATCH_LINES = 500
+
+
+class PipeReader:
+    """Reads a text stream on a dedicated thread and spools it into an in-memory buffer.
+
+    A second thread flushes the buffer to sink(lines) at most every flush_interval seconds,
+    or as soon as max_lines are waiting, so the child never waits on the GUI and the GUI
+    gets one update per batch instead of one per line.
+    """
+    def __init__(self, stream, sink, flush_interval=FLUSH_INTERVAL, max_lines=MAX_BATCH_LINES):
+        self.stream = stream
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.max_lines = max_lines
+        self.lines_read = 0
+        self.first_line_at = None
+        self._buffer = []
+        self._eof = False
+        self._cond = threading.Condition()
+        self._reader = threading.Thread(target=self._read, name="pipe-reader", daemon=True)
+        self._flusher = threading.Thread(target=self._flush_loop, name="pipe-flusher", daemon=True)
+
+    def start(self):
+        self._reader.start()
+        self._flusher.start()
+        return self
+
+    def join(self, timeout=None):
+        """Wait until the pipe is closed and everything read has been handed to the sink."""
+        self._reader.join(timeout)
+        if self._reader.is_alive():
+            # Something outside the killed tree still holds the pipe; stop waiting for it
+            with self._cond:
+                self._eof = True
+                self._cond.notify()
+        self._flusher.join(timeout)
+
+    def _read(self):
+        try:
+            for line in iter(self.stream.readline, ''):
+                with self._cond:
+                    if self.first_line_at is None:
+                        self.first_line_at = time.monotonic()
+                    self._buffer.append(line)
+                    self.lines_read += 1
+                    if len(self._buffer) == 1 or len(self._buffer) >= self.max_lines:
+                        self._cond.notify()
+        except (OSError, ValueError):
+            pass  # Pipe closed underneath us
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                # Sleep until the first line of a batch arrives, then give the batch time to fill up
+                while not self._buffer and not self._eof:
+                    self._cond.wait()
+                if not self._eof and len(self._buffer) < self.max_lines:
+                    self._cond.wait(self.flush_interval)
+                lines, self._buffer = self._buffer, []
+                done = self._eof
+            if lines:
+                self.sink(lines)
+            if done:
+                return
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Listen address resolution and port availability checks for the launched programs."""
+import socket
+
+# Ports the upstream scripts listen on when --port is not given
+DEFAULT_PORTS = {"gradio_app.py": 8080, "api_server.py": 8081}
+DEFAULT_HOST = "0.0.0.0"
+
+
+def program_endpoint(script, params):
+    """Return (host, port) the program will listen on, or None if it is unknown."""
+    port = str(params.get("--port") or "").strip() or DEFAULT_PORTS.get(script)
+    if port is None:
+        return None
+    try:
+        port = int(port)
+    except ValueError:
+        return None
+    host = str(params.get("--host") or "").strip() or DEFAULT_HOST
+    return host, port
+
+
+def connect_host(host):
+    """Address to connect to for a server listening on host."""
+    return "127.0.0.1" if host in ("0.0.0.0", "", "::") else host
+
+
+def port_available(host, port):
+    """Whether nothing is listening on port, checked by connecting and by binding it."""
+    try:
+        with socket.create_connection((connect_host(host), port), timeout=0.5):
+            return False
+    except OSError:
+        pass
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        sock.bind((host if host != "::" else "0.0.0.0", port))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def free_port(host="127.0.0.1"):
+    """A port nothing listens on right now, chosen by the operating system."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def free_port_range(count, host="127.0.0.1", attempts=20):
+    """The first of count consecutive ports nothing listens on right now."""
+    for _ in range(attempts):
+        first = free_port(host)
+        if first + count <= 65536 and all(port_available(host, port) for port in range(first + 1, first + count)):
+            return first
+    raise OSError(f"No {count} consecutive free ports found")
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Detects when a launched server starts accepting connections."""
+import json
+import time
+import socket
+import threading
+import http.client
+
+from launcher_core.ports import connect_host
+
+
+def server_answers(host, port, path=None, timeout=2):
+    """Whether host:port accepts a connection, or with path, answers a GET of it with 2xx or 3xx."""
+    try:
+        if not path:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        try:
+            conn.request("GET", path)
+            return 200 <= conn.getresponse().status < 400
+        finally:
+            conn.close()
+    except (OSError, http.client.HTTPException):
+        return False
+
+
+class ReadinessProbe:
+    """Polls host:port, and optionally an HTTP path, on a background thread until the server answers.
+
+    With a path only a 2xx or 3xx response counts as ready, otherwise an accepted TCP
+    connection does. Elapsed times are measured from the creation of the probe.
+    """
+    def __init__(self, host, port, path=None, timeout=1800, interval=0.5):
+        self.host = connect_host(host)
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.interval = interval
+        self.started_at = time.monotonic()
+        self.ready_seconds = None
+
+    def check(self):
+        return server_answers(self.host, self.port, self.path)
+
+    def start(self, on_ready, on_timeout=None, should_continue=lambda: True):
+        """Poll until ready, calling on_ready(seconds), or until timeout or should_continue() turns false."""
+        def _run():
+            while should_continue():
+                if self.check():
+                    self.ready_seconds = time.monotonic() - self.started_at
+                    on_ready(self.ready_seconds)
+                    return
+                elapsed = time.monotonic() - self.started_at
+                if self.timeout and elapsed >= self.timeout:
+                    if on_timeout:
+                        on_timeout(elapsed)
+                    return
+                time.sleep(self.interval)
+        threading.Thread(target=_run, name="readiness-probe", daemon=True).start()
+        return self
+
+
+def record_ready_time(path, program, seconds, arguments):
+    """Append one time-to-ready measurement as a JSON line, for comparing launch settings."""
+    entry = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "program": program,
+        "ready_seconds": round(seconds, 2),
+        "arguments": arguments,
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
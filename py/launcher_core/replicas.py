@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Supervised extra server processes that run next to the launcher's main child."""
+import sys
+import time
+import threading
+import subprocess
+
+from launcher_core.logpipe import PipeReader
+
+# A replica that exits sooner than this after its start counts as crashing in a loop
+STABLE_SECONDS = 60
+
+
+def restart_delay(crashes, base=5.0):
+    """Seconds to wait before restarting a server after crashes quick crashes in a row, up to a minute."""
+    return min(60.0, base * 2 ** max(0, crashes - 1))
+
+
+class Replica:
+    """One more copy of a server, started again whenever it exits until stop() is called.
+
+    Its output is handed to sink(replica, lines) in batches. on_exit(replica, returncode) is
+    called when it exits on its own, with None if it could not be started at all, in which
+    case it is not retried. Restarts of a replica that keeps crashing back off exponentially
+    from restart_delay up to a minute.
+    """
+    def __init__(self, index, command, cwd, env, sink, on_exit, restart_delay=5.0):
+        self.index = index
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.sink = sink
+        self.on_exit = on_exit
+        self.restart_delay = restart_delay
+        self.process = None
+        self.restarts = 0
+        self._stopped = threading.Event()
+        # Held while a process is spawned, so stop() either prevents it or sees it
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"replica-{index}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        crashes = 0
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            with self._lock:
+                if self._stopped.is_set():
+                    return
+                try:
+                    self.process = subprocess.Popen(
+                        self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                        text=True, encoding='utf-8', errors='replace', env=self.env, cwd=self.cwd,
+                        creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+                    )
+                except OSError:
+                    self.on_exit(self, None)
+                    return
+            reader = PipeReader(self.process.stdout, lambda lines: self.sink(self, lines)).start()
+            self.process.wait()
+            reader.join(5)
+            if self._stopped.is_set():
+                return
+            crashes = crashes + 1 if time.monotonic() - started < STABLE_SECONDS else 0
+            self.restarts += 1
+            self.on_exit(self, self.process.returncode)
+            self._stopped.wait(restart_delay(crashes, self.restart_delay))
+
+    def stop(self, kill_tree):
+        """Stop supervising and end the process tree with kill_tree(pid)."""
+        with self._lock:
+            self._stopped.set()
+            process = self.process
+        if process and process.poll() is None:
+            kill_tree(process.pid)
+        self._thread.join(5)
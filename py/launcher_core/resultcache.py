@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Disk cache of API responses keyed by request content, and collapsing of identical requests in flight."""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+
+def request_key(method, path, body, config):
+    """Hash of everything that determines a generation: the request itself and the model settings."""
+    digest = hashlib.sha256()
+    for part in (method, path, json.dumps(config, sort_keys=True)):
+        digest.update(part.encode("utf-8") + b"\0")
+    digest.update(body or b"")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Response bodies stored as root/<key[:2]>/<key>.bin with their headers in a .json next to them.
+
+    Entries are only visible once complete. Reading one marks it as used by touching its
+    modification time, and the least recently used entries are deleted whenever the total
+    size exceeds max_bytes.
+    """
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        # Requests answered from disk, sent to the server, and answered by an identical one in flight
+        self.counts = {"hits": 0, "misses": 0, "collapsed": 0}
+        self._lock = threading.Lock()
+        self._entries = {}
+        if self.root.is_dir():
+            for path in self.root.glob("*/*.bin"):
+                try:
+                    self._entries[path.stem] = path.stat().st_size
+                except OSError:
+                    pass
+            # Left behind by responses that were cut off when the launcher exited
+            for path in self.root.glob("*/*.tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _paths(self, key):
+        folder = self.root / key[:2]
+        return folder / f"{key}.bin", folder / f"{key}.json"
+
+    def open(self, key):
+        """Return (headers, open body file, size) for a cached response, or None."""
+        body, meta = self._paths(key)
+        try:
+            with open(meta, 'r', encoding='utf-8') as f:
+                headers = json.load(f)
+            stream = open(body, "rb")
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(body)
+        except OSError:
+            pass
+        return headers, stream, os.fstat(stream.fileno()).st_size
+
+    def record(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def writer(self, key, headers):
+        return _EntryWriter(self, key, headers)
+
+    def _commit(self, key, size):
+        with self._lock:
+            self._entries[key] = size
+            if sum(self._entries.values()) <= self.max_bytes:
+                return
+            used = []
+            for other in self._entries:
+                try:
+                    used.append((self._paths(other)[0].stat().st_mtime, other))
+                except OSError:
+                    used.append((0, other))
+            total = sum(self._entries.values())
+            for _, other in sorted(used):
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(other):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= self._entries.pop(other)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, entries=len(self._entries), bytes=sum(self._entries.values()), max_bytes=self.max_bytes)
+
+
+class _EntryWriter:
+    """Spools a response into a temporary file and publishes it as an entry on commit()."""
+    def __init__(self, cache, key, headers):
+        self.cache = cache
+        self.key = key
+        self.headers = headers
+        self.size = 0
+        self.body, self.meta = cache._paths(key)
+        self.body.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = self.body.with_name(f"{key}.{threading.get_ident()}.tmp")
+        self.file = open(self.tmp, "wb")
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        self.file.close()
+        if self.size > self.cache.max_bytes:
+            return self.discard()
+        try:
+            with open(self.meta, 'w', encoding='utf-8') as f:
+                json.dump(self.headers, f)
+            os.replace(self.tmp, self.body)
+        except OSError:
+            return self.discard()
+        self.cache._commit(self.key, self.size)
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
+
+
+class SingleFlight:
+    """Lets one caller per key do the work while others with the same key wait for it to finish."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def join(self, key):
+        """Return (leader, done): the leader does the work and must call finish(key); others wait on done."""
+        with self._lock:
+            done = self._flights.get(key)
+            if done is not None:
+                return False, done
+            done = self._flights[key] = threading.Event()
+            return True, done
+
+    def finish(self, key):
+        with self._lock:
+            done = self._flights.pop(key, None)
+        if done is not None:
+            done.set()
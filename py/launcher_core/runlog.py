@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Persistent per-run log files written by a background thread."""
+import os
+import gzip
+import time
+import queue
+import shutil
+import threading
+from pathlib import Path
+
+_CLOSE = object()
+
+
+class RunLogWriter:
+    """Appends a run's output to a log file with rotation by size and segment count.
+
+    write() only enqueues, so the process read loop never waits on the disk; all file
+    I/O, rotation and gzip compression of closed segments happen on the writer thread.
+    """
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5, compress=False):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="run-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        self._queue.put(text)
+
+    def close(self, timeout=5):
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(self.path, 'a', encoding='utf-8', errors='replace')
+        except OSError:
+            # Logging must never take the launcher down; drain and drop
+            while self._queue.get() is not _CLOSE:
+                pass
+            return
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _CLOSE:
+                    break
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                lines = item.rstrip("\n").split("\n")
+                f.write("".join(f"{stamp} {line.rstrip()}\n" for line in lines))
+                # Flush once the burst has been written rather than per line
+                if self._queue.empty():
+                    f.flush()
+                if self.max_bytes and f.tell() >= self.max_bytes:
+                    f.close()
+                    self._rotate()
+                    f = open(self.path, 'a', encoding='utf-8', errors='replace')
+        except OSError:
+            pass
+        finally:
+            f.close()
+
+    def _segment(self, index):
+        plain = self.path.with_name(f"{self.path.name}.{index}")
+        packed = plain.with_name(plain.name + ".gz")
+        return packed if packed.exists() else plain
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            self.path.unlink()
+            return
+        oldest = self._segment(self.backup_count)
+        if oldest.exists():
+            oldest.unlink()
+        for index in range(self.backup_count - 1, 0, -1):
+            src = self._segment(index)
+            if src.exists():
+                suffix = ".gz" if src.name.endswith(".gz") else ""
+                os.replace(src, self.path.with_name(f"{self.path.name}.{index + 1}{suffix}"))
+        closed = self.path.with_name(f"{self.path.name}.1")
+        os.replace(self.path, closed)
+        if self.compress:
+            with open(closed, 'rb') as src, gzip.open(closed.with_name(closed.name + ".gz"), 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            closed.unlink()
+
+
+def prune_run_logs(directory, keep):
+    """Delete the logs of all but the newest keep runs in directory."""
+    directory = Path(directory)
+    if keep <= 0 or not directory.is_dir():
+        return
+    runs = {}
+    for path in directory.glob("*.log*"):
+        name = path.name
+        runs.setdefault(name[:name.index(".log") + 4], []).append(path)
+    for run in sorted(runs, key=lambda r: max(p.stat().st_mtime for p in runs[r]), reverse=True)[keep:]:
+        for path in runs[run]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Runs independent build commands concurrently, each with its own output channel."""
+import sys
+import os
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from launcher_core.logpipe import PipeReader
+
+# Several launcher runs may build the same package at the same time; jobs sharing a
+# lock key are serialised across all schedulers in the process.
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+# Lock key of every job that installs into the shared site-packages: concurrent pip runs
+# would interleave their writes to RECORD files and half-finished uninstalls
+SITE_PACKAGES_LOCK = "site-packages"
+
+
+def _build_lock(key):
+    with _build_locks_guard:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def site_packages_lock():
+    """The lock held by install jobs, for pip runs made outside a scheduler."""
+    return _build_lock(SITE_PACKAGES_LOCK)
+
+
+class BuildJob:
+    """A single command to run, identified by a tag used as its log channel name."""
+    def __init__(self, tag, command, cwd=None, lock_key=None):
+        self.tag = tag
+        self.command = command
+        self.cwd = cwd
+        self.lock_key = lock_key or tag
+        self.returncode = None
+        self.seconds = 0.0
+
+
+class BuildScheduler:
+    """Runs BuildJobs in a pool bounded by the CPU core count.
+
+    Every job is a separate child process, so the pool threads only supervise them
+    and forward their output in batches of lines to on_output(tag, text).
+    """
+    def __init__(self, env, on_output, kill_tree, should_continue=lambda: True, max_workers=None):
+        self.env = env
+        self.on_output = on_output
+        self.kill_tree = kill_tree
+        self.should_continue = should_continue
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._cancelled = False
+
+    def run(self, jobs, on_start=None, on_done=None):
+        """Run all jobs and block until they finish; returns the same list with results filled in."""
+        if not jobs:
+            return jobs
+        workers = min(len(jobs), self.max_workers)
+        env = dict(self.env)
+        # Split the cores between concurrent builds so ninja does not oversubscribe the machine
+        if "MAX_JOBS" not in env:
+            env["MAX_JOBS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+        def _run(job):
+            if self._cancelled or not self.should_continue():
+                job.returncode = -1
+                return job
+            with _build_lock(job.lock_key):
+                if on_start:
+                    on_start(job)
+                start = time.monotonic()
+                job.returncode = self._run_one(job, env) if not self._cancelled else -1
+                job.seconds = time.monotonic() - start
+            if on_done:
+                on_done(job)
+            return job
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="build") as pool:
+            list(pool.map(_run, jobs))
+        return jobs
+
+    def _run_one(self, job, env):
+        process = subprocess.Popen(
+            job.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding='utf-8', errors='replace', cwd=job.cwd,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0,
+            env=env
+        )
+        with self._lock:
+            self._processes[job.tag] = process
+        reader = PipeReader(process.stdout, lambda lines: self.on_output(job.tag, "".join(lines))).start()
+        try:
+            while True:
+                try:
+                    process.wait(timeout=0.1)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self._cancelled or not self.should_continue():
+                        self.kill_tree(process.pid)
+                        reader.join(5)
+                        return -1
+            reader.join()
+            return process.returncode
+        finally:
+            with self._lock:
+                self._processes.pop(job.tag, None)
+
+    def cancel(self):
+        """Kill every running job; pending jobs are not started."""
+        self._cancelled = True
+        with self._lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            self.kill_tree(process.pid)
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""Helpers for launcher options stored next to the environment variables in global_settings."""
+
+
+def number_setting(settings, name, default, cast=int):
+    """Read a numeric option entered as text, falling back to default when it is empty or invalid."""
+    value = settings.get(name, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return cast(value)
+    try:
+        return cast(str(value).strip())
+    except ValueError:
+        return default
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""On-disk line store backing the output pane's scrollback."""
+import threading
+from array import array
+from pathlib import Path
+
+# One offset is kept per INDEX_STRIDE lines, so the index stays tiny even for week-long sessions
+INDEX_STRIDE = 256
+
+
+class SpillLog:
+    """Append-only UTF-8 line file with a sparse line-offset index for random access."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w+b')
+        self._index = array('Q')
+        self._size = 0
+        self._lock = threading.Lock()
+        self.line_count = 0
+
+    def append(self, lines):
+        with self._lock:
+            chunks = []
+            for line in lines:
+                if self.line_count % INDEX_STRIDE == 0:
+                    self._index.append(self._size)
+                data = line.encode('utf-8', 'replace') + b"\n"
+                chunks.append(data)
+                self._size += len(data)
+                self.line_count += 1
+            self._file.seek(0, 2)
+            self._file.write(b"".join(chunks))
+
+    def read_lines(self, start, count):
+        """Return up to count lines starting at line number start."""
+        with self._lock:
+            start = max(0, start)
+            if start >= self.line_count or count <= 0:
+                return []
+            self._file.flush()
+            block = start // INDEX_STRIDE
+            self._file.seek(self._index[block])
+            for _ in range(start - block * INDEX_STRIDE):
+                self._file.readline()
+            lines = []
+            for _ in range(min(count, self.line_count - start)):
+                lines.append(self._file.readline().decode('utf-8', 'replace').rstrip("\n"))
+            return lines
+
+    def close(self, delete=True):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        if delete:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Startup time measurement against a budget, from process creation to the first window paint.
+
+Run as a regression check, e.g. from py/:
+    python -m launcher_core.startup launcher.en.py launcher.zh.py
+starts each launcher a few times with --startup-check and exits with 1 when the median
+startup time exceeds the budget, a run-time only module was imported before the first
+paint, or a launcher fails to start.
+"""
+import os
+import sys
+import time
+
+# Wall-clock time of the budget; LAUNCHER_STARTUP_BUDGET_MS overrides it, e.g. for slower CI machines
+STARTUP_BUDGET_MS = 1500
+
+# Fallback start time when the process creation time cannot be queried
+_MODULE_LOADED_AT = time.time()
+_start_time = None
+
+# Modules only needed once something runs; importing one before the first paint is a regression
+DEFERRED_MODULES = ("psutil", "subprocess", "launcher_core.buildcache", "launcher_core.scheduler",
+                    "launcher_core.gateway", "launcher_core.runlog", "launcher_core.spill")
+
+
+def _query_start_time():
+    """Creation time of the current process from the OS, or None; kept free of psutil, which is slow to import."""
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/stat", encoding="utf-8") as f:
+            # The command name in parentheses may contain spaces; starttime is the 22nd field
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="utf-8") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - ticks / os.sysconf("SC_CLK_TCK"))
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.windll.kernel32
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), *(ctypes.byref(t) for t in times)):
+            created = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+            # FILETIME counts 100 ns intervals since 1601-01-01
+            return created / 1e7 - 11644473600
+    return None
+
+
+def process_start_time():
+    """Creation time of the current process, or the time this module was first imported."""
+    global _start_time
+    if _start_time is None:
+        try:
+            _start_time = _query_start_time() or _MODULE_LOADED_AT
+        except (OSError, ValueError, IndexError, AttributeError):
+            _start_time = _MODULE_LOADED_AT
+    return _start_time
+
+
+def elapsed_since_start_ms():
+    return (time.time() - process_start_time()) * 1000
+
+
+def startup_budget_ms():
+    try:
+        return int(os.environ.get("LAUNCHER_STARTUP_BUDGET_MS", STARTUP_BUDGET_MS))
+    except ValueError:
+        return STARTUP_BUDGET_MS
+
+
+def eager_imports():
+    """The DEFERRED_MODULES that are already imported."""
+    return [name for name in DEFERRED_MODULES if name in sys.modules]
+
+
+def measure_startup(script, runs=3, timeout=60):
+    """Start script with --startup-check runs times.
+
+    Returns (startup_ms, eager imports) of each run, or None for runs that reported nothing.
+    """
+    import subprocess
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = []
+    for _ in range(runs):
+        try:
+            completed = subprocess.run([sys.executable, script, "--startup-check"], capture_output=True,
+                                       text=True, encoding="utf-8", errors="replace", env=env, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            results.append(None)
+            continue
+        values = dict(part.split("=", 1) for line in completed.stdout.splitlines()
+                      if line.startswith("startup_ms=") for part in line.split())
+        eager = [name for name in values.get("eager_imports", "").split(",") if name]
+        results.append((float(values["startup_ms"]), eager) if "startup_ms" in values else None)
+    return results
+
+
+def check_startup(scripts, runs=3):
+    """Print the startup times of scripts; returns whether every median is within the budget with nothing imported early."""
+    budget = startup_budget_ms()
+    ok = True
+    for script in scripts:
+        results = measure_startup(script, runs)
+        if None in results:
+            print(f"FAIL {script}: {results.count(None)} of {len(results)} run(s) did not report a startup time")
+            ok = False
+            continue
+        times = [ms for ms, _ in results]
+        median = sorted(times)[len(times) // 2]
+        eager = sorted({name for _, names in results for name in names})
+        within = median <= budget and not eager
+        ok = ok and within
+        runs_text = ", ".join(f"{t:.0f}" for t in times)
+        print(f"{'ok' if within else 'FAIL'} {script}: median {median:.0f} ms of {runs_text} ms, budget {budget} ms")
+        if eager:
+            print(f"  imported before the first paint: {', '.join(eager)}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_startup(sys.argv[1:] or ["launcher.en.py", "launcher.zh.py"]) else 1)
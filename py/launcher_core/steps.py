@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Declarative launch steps: a dependency graph whose independent steps run concurrently."""
+import os
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from launcher_core.buildcache import IGNORED_DIRS, IGNORED_SUFFIXES
+
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Step:
+    """One unit of a launch; action() runs once every step named in deps is done or skipped.
+
+    Like a make target, a step is up to date and skipped when all its outputs exist and are
+    newer than every source file below its inputs. shallow_inputs are directories whose own
+    modification time counts, which changes whenever entries are added or removed, e.g.
+    site-packages. stamp is a file touched after a successful run and counted as an output.
+    Steps without outputs always run. action() returns False to fail the step.
+    """
+    def __init__(self, name, action, deps=(), inputs=(), shallow_inputs=(), outputs=(), stamp=None):
+        self.name = name
+        self.action = action
+        self.deps = [d.name if isinstance(d, Step) else d for d in deps]
+        self.inputs = [Path(p) for p in inputs]
+        self.shallow_inputs = [Path(p) for p in shallow_inputs]
+        self.outputs = [Path(p) for p in outputs] + ([Path(stamp)] if stamp else [])
+        self.stamp = Path(stamp) if stamp else None
+        self.status = None
+        self.error = None
+        self.seconds = 0.0
+
+    def up_to_date(self):
+        if not self.outputs:
+            return False
+        try:
+            oldest_output = min(p.stat().st_mtime for p in self.outputs)
+        except OSError:
+            return False
+        return newest_mtime(self.inputs, self.shallow_inputs) <= oldest_output
+
+    def touch_stamp(self):
+        if self.stamp:
+            try:
+                self.stamp.parent.mkdir(parents=True, exist_ok=True)
+                self.stamp.touch()
+            except OSError:
+                pass
+
+
+def newest_mtime(inputs, shallow_inputs=()):
+    """Latest modification time of the given files, the source files below the given directories and the shallow ones themselves."""
+    newest = 0.0
+    for path in shallow_inputs:
+        try:
+            newest = max(newest, path.stat().st_mtime)
+        except OSError:
+            pass
+    for path in inputs:
+        if not path.is_dir():
+            try:
+                newest = max(newest, path.stat().st_mtime)
+            except OSError:
+                pass
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS and not d.endswith(".egg-info")]
+            # Build products may be written next to the sources and are outputs, not inputs
+            names = [os.path.join(dirpath, f) for f in filenames if os.path.splitext(f)[1].lower() not in IGNORED_SUFFIXES]
+            for name in [dirpath] + names:
+                try:
+                    newest = max(newest, os.stat(name).st_mtime)
+                except OSError:
+                    pass
+    return newest
+
+
+class StepGraph:
+    """Runs steps in dependency order, each on its own worker thread as soon as its deps allow."""
+    def __init__(self, steps=()):
+        self.steps = {}
+        for step in steps:
+            self.add(step)
+
+    def add(self, step):
+        if step.name in self.steps:
+            raise ValueError(f"Duplicate step: {step.name}")
+        self.steps[step.name] = step
+        return step
+
+    def run(self, should_continue, on_start=None, on_done=None):
+        """Run all steps; returns a map of step name to DONE, SKIPPED, FAILED or CANCELLED.
+
+        on_start(step) is called before an action runs, on_done(step) after every step has
+        its status, including skipped and cancelled ones.
+        """
+        for step in self.steps.values():
+            missing = [d for d in step.deps if d not in self.steps]
+            if missing:
+                raise ValueError(f"Step {step.name} depends on unknown steps: {', '.join(missing)}")
+            step.status, step.error = None, None
+        waiting = dict(self.steps)
+        running = {}
+
+        def finish(step, status):
+            step.status = status
+            if on_done:
+                on_done(step)
+
+        def execute(step):
+            if on_start:
+                on_start(step)
+            start = time.monotonic()
+            try:
+                ok = step.action() is not False
+            except Exception as e:
+                step.error = e
+                ok = False
+            finally:
+                step.seconds = time.monotonic() - start
+            return ok
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.steps)), thread_name_prefix="step") as pool:
+            while waiting or running:
+                # Skipping or cancelling a step settles it at once, which may free steps listed before it
+                settled = True
+                while settled:
+                    settled = False
+                    for step in list(waiting.values()):
+                        states = [self.steps[d].status for d in step.deps]
+                        if any(s in (FAILED, CANCELLED) for s in states) or not should_continue():
+                            del waiting[step.name]
+                            finish(step, CANCELLED)
+                            settled = True
+                        elif all(s in (DONE, SKIPPED) for s in states):
+                            del waiting[step.name]
+                            if step.up_to_date():
+                                finish(step, SKIPPED)
+                                settled = True
+                            else:
+                                running[pool.submit(execute, step)] = step
+                if not running:
+                    if waiting:
+                        # Nothing runs and nothing settled, so whatever is left waits on itself
+                        for step in list(waiting.values()):
+                            finish(step, CANCELLED)
+                        waiting.clear()
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    if not should_continue():
+                        finish(step, CANCELLED)
+                    elif future.result():
+                        step.touch_stamp()
+                        finish(step, DONE)
+                    else:
+                        finish(step, FAILED)
+        return {name: step.status for name, step in self.steps.items()}
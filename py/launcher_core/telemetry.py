@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Resource sampling of a child process tree with psutil."""
+import csv
+import time
+import threading
+from collections import deque
+
+import psutil
+
+# About an hour of history at the default one-second interval
+DEFAULT_CAPACITY = 3600
+
+FIELDS = ("time", "cpu_percent", "rss_bytes", "threads", "read_bytes", "write_bytes", "processes")
+
+_BARS = "▁▂▃▄▅▆▇█"
+
+
+class TreeSampler:
+    """Samples CPU %, RSS, thread count and I/O bytes summed over a process and all its descendants.
+
+    Samples are dicts keyed by FIELDS, kept in a fixed-size ring buffer by a background
+    thread; the I/O counters are cumulative, as reported by the operating system.
+    """
+    def __init__(self, pid, interval=1.0, capacity=DEFAULT_CAPACITY):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._samples = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._processes = {}
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(self.interval + 1)
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def _run(self):
+        while not self._stop.is_set():
+            sample = self._sample()
+            if sample is None:
+                break
+            with self._lock:
+                self._samples.append(sample)
+                self.peak_rss = max(self.peak_rss, sample["rss_bytes"])
+            self._stop.wait(self.interval)
+
+    def _sample(self):
+        try:
+            root = psutil.Process(self.pid)
+            tree = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        sample = dict.fromkeys(FIELDS, 0)
+        sample["time"] = time.time()
+        alive = {}
+        for proc in tree:
+            # cpu_percent() measures since the previous call on the same Process object
+            proc = self._processes.get(proc.pid, proc)
+            try:
+                with proc.oneshot():
+                    sample["cpu_percent"] += proc.cpu_percent(None)
+                    sample["rss_bytes"] += proc.memory_info().rss
+                    sample["threads"] += proc.num_threads()
+                    try:
+                        io = proc.io_counters()
+                        sample["read_bytes"] += io.read_bytes
+                        sample["write_bytes"] += io.write_bytes
+                    except (psutil.AccessDenied, AttributeError):
+                        pass
+            except psutil.Error:
+                continue
+            alive[proc.pid] = proc
+            sample["processes"] += 1
+        self._processes = alive
+        return sample
+
+    def write_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for sample in self.samples():
+                row = dict(sample)
+                row["time"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sample["time"]))
+                row["cpu_percent"] = round(sample["cpu_percent"], 1)
+                writer.writerow(row)
+
+
+def tree_rss(pid):
+    """Resident memory of a process and all its descendants, 0 if it is gone."""
+    try:
+        root = psutil.Process(pid)
+        tree = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0
+    total = 0
+    for proc in tree:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+def io_rates(samples):
+    """Read plus write bytes per second between consecutive samples."""
+    rates = []
+    for prev, cur in zip(samples, samples[1:]):
+        seconds = max(cur["time"] - prev["time"], 1e-6)
+        delta = cur["read_bytes"] + cur["write_bytes"] - prev["read_bytes"] - prev["write_bytes"]
+        rates.append(max(delta, 0) / seconds)
+    return rates
+
+
+def sparkline(values, width=30):
+    """Render the last width values as a row of block characters scaled to their maximum."""
+    values = list(values)[-width:]
+    if not values:
+        return ""
+    top = max(values) or 1
+    return "".join(_BARS[min(len(_BARS) - 1, int(v / top * (len(_BARS) - 1) + 0.5))] for v in values)
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Timing spans for the phases of a launch, exportable as a Chrome trace."""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Timeline:
+    """Collects named spans on any thread; times are seconds relative to the creation of the timeline.
+
+    Each span is drawn on a lane, which becomes a thread row in chrome://tracing or Perfetto.
+    """
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.wall_origin = time.time()
+        self.total = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category="launch", lane="launcher"):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.monotonic(), category, lane)
+
+    def add(self, name, start, end, category="launch", lane="launcher"):
+        """Record a span from monotonic timestamps start to end."""
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "category": category,
+                "lane": lane,
+                "start": start - self.origin,
+                "duration": max(0.0, end - start),
+            })
+
+    def close(self):
+        self.total = time.monotonic() - self.origin
+
+    def summary_lines(self, width=20):
+        """One line per span in start order: start, duration, a bar proportional to the duration, name."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        longest = max((s["duration"] for s in spans), default=0) or 1
+        return [
+            f"{s['start']:8.1f}s {s['duration']:8.1f}s  {'█' * round(s['duration'] / longest * width):<{width}}  {s['name']}"
+            for s in spans
+        ]
+
+    def chrome_trace(self):
+        with self._lock:
+            spans = list(self.spans)
+        lanes = {}
+        events = []
+        for s in spans:
+            tid = lanes.setdefault(s["lane"], len(lanes) + 1)
+            events.append({
+                "name": s["name"], "cat": s["category"], "ph": "X", "pid": os.getpid(), "tid": tid,
+                "ts": round(s["start"] * 1e6), "dur": round(s["duration"] * 1e6),
+            })
+        for lane, tid in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": lane}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.wall_origin))}}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Local directory of built extension wheels, so each source state is compiled only once."""
+import zipfile
+from pathlib import Path
+
+from launcher_core.buildcache import abi_tag, _dist_version
+
+
+class Wheelhouse:
+    """Wheels are stored as root/<name>/<python and platform tag>-torch<version>-<source hash>/*.whl.
+
+    The directory can be copied to other machines with the same Python, platform and torch;
+    installs from it use pip's --no-index --find-links and never touch the network or a compiler.
+    """
+    def __init__(self, root, python):
+        self.root = Path(root)
+        self.python = python
+
+    def slot(self, name, source_hash):
+        return self.root / name / f"{abi_tag()}-torch{_dist_version('torch') or 'none'}-{source_hash[:16]}"
+
+    def find(self, name, source_hash):
+        """Return the stored wheel for this source state, or None if it has not been built yet."""
+        wheels = sorted(self.slot(name, source_hash).glob("*.whl"))
+        return wheels[-1] if wheels else None
+
+    def build_command(self, target, name, source_hash):
+        """pip command that builds target, a project directory or a PyPI name, into its slot."""
+        return [self.python, "-sm", "pip", "wheel", "--no-build-isolation", "--no-deps",
+                "--wheel-dir", str(self.slot(name, source_hash)), target]
+
+    def install_command(self, wheel):
+        return [self.python, "-sm", "pip", "install", "--no-index", "--find-links", str(wheel.parent),
+                "--no-deps", "--force-reinstall", wheel_dist_name(wheel)]
+
+
+def wheel_dist_name(wheel):
+    """Distribution name from a wheel file name, e.g. custom_rasterizer-0.1-cp312-....whl."""
+    return Path(wheel).name.split("-")[0]
+
+
+def extract_file(wheel, filename, dst):
+    """Copy the file called filename out of wheel to dst; returns whether the wheel contained it."""
+    with zipfile.ZipFile(wheel) as zf:
+        for member in zf.namelist():
+            if member.rsplit("/", 1)[-1] == filename:
+                Path(dst).write_bytes(zf.read(member))
+                return True
+    return False